@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .context import build_site_context
+from .coords import geocode
+from .final_map import score_sites
+from .registry import load_active_model
+
+BATCH_WORKERS = os.cpu_count() or 1
+DEFAULT_SCALE = 50
+
+BBOX_COLUMNS = ['min_lat', 'max_lat', 'min_lon', 'max_lon']
+RESULT_COLUMNS = [
+    'name', 'address', 'scale', *BBOX_COLUMNS,
+    'cells', 'developable_cells', 'suitable_cells',
+    'best_score', 'best_lat', 'best_lon',
+    'mean_wind_speed', 'mean_radiation',
+    'model_version', 'seconds', 'error',
+]
+
+def read_sites(source) -> list:
+    """Sites from a CSV with an address column or min_lat, max_lat, min_lon, max_lon columns.
+
+    Optional columns: name, and scale (km) for address rows.
+    """
+    df = pd.read_csv(source)
+    has_address = 'address' in df.columns
+    has_bbox = all(column in df.columns for column in BBOX_COLUMNS)
+    if not has_address and not has_bbox:
+        raise ValueError(f"CSV needs an 'address' column or {', '.join(BBOX_COLUMNS)} columns")
+
+    sites = []
+    for i, row in enumerate(df.to_dict('records')):
+        address = row.get('address') if has_address and pd.notna(row.get('address')) else None
+        coords = None
+        if has_bbox and all(pd.notna(row[column]) for column in BBOX_COLUMNS):
+            coords = [float(row[column]) for column in BBOX_COLUMNS]
+        scale = row.get('scale')
+        name = row.get('name')
+
+        sites.append({
+            'name': str(name) if pd.notna(name) else (address or f'site {i + 1}'),
+            'address': address,
+            'scale': int(scale) if pd.notna(scale) else DEFAULT_SCALE,
+            'coords': coords,
+        })
+    return sites
+
+def _result_row(site: dict) -> dict:
+    row = dict.fromkeys(RESULT_COLUMNS)
+    row.update(name=site['name'], address=site['address'], scale=site['scale'])
+    if site['coords'] is not None:
+        row.update(zip(BBOX_COLUMNS, site['coords']))
+    return row
+
+def screen_site(site: dict) -> dict:
+    """Fetch, score and summarize one site whose bounding box is known.
+
+    Runs in a worker process, which keeps its loaded model between sites.
+    """
+    start = time.perf_counter()
+    row = _result_row(site)
+
+    try:
+        model = load_active_model()
+        if model is None:
+            raise RuntimeError("No trained site classifier, run `python App/train.py` first")
+        row['model_version'] = model[0]
+
+        ctx = build_site_context(site['name'], site['scale'], coords=site['coords'])
+        cells, suitability_scores, selected = score_sites(ctx, model)
+
+        row.update(
+            cells=ctx.lats.size * ctx.lons.size,
+            developable_cells=len(cells),
+            suitable_cells=int(selected.sum()),
+            # Cells outside a raster provider's coverage are NaN
+            mean_wind_speed=float(np.nanmean(ctx.wind_speeds)),
+            mean_radiation=float(np.nanmean(ctx.radiation_levels)),
+        )
+        if len(cells):
+            best = int(np.argmax(suitability_scores))
+            row.update(
+                best_score=float(suitability_scores[best]),
+                best_lat=float(cells['lat'][best]),
+                best_lon=float(cells['lon'][best]),
+            )
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+def run_batch(sites: list, executor=None, workers: int = BATCH_WORKERS):
+    """Screen many sites, yielding one result row per site as soon as it completes.
+
+    Addresses are geocoded here, one at a time, so every lookup goes through
+    the shared geocode cache and rate limit. Each site is submitted as soon as
+    its bounding box is known and runs in parallel on executor, or on a process
+    pool created for this batch. Sites that finish during geocoding are
+    yielded between lookups. If the pool breaks, the sites that did not finish
+    are screened in this process instead, and a broken shared render pool is
+    reset for later requests.
+    """
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, max(len(sites), 1)),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    pending = {}   # future -> site
+    fallback = []  # Sites to screen in this process once the pool is broken
+
+    def pool_broke(site):
+        if not fallback and not owns_executor:
+            # A caller's pool may be the app's shared render pool, which every session would otherwise keep using
+            from .pipeline import reset_render_pool
+            reset_render_pool(executor)
+        fallback.append(site)
+
+    def result_of(future):
+        # The finished site's row, or None if the pool broke and the site is left for the fallback
+        site = pending.pop(future)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            pool_broke(site)
+            return None
+
+    try:
+        for site in sites:
+            # Geocoding is rate limited, so yield what the workers finished meanwhile
+            for future in [future for future in pending if future.done()]:
+                row = result_of(future)
+                if row is not None:
+                    yield row
+
+            if site['coords'] is None:
+                coords = geocode(site['address'], site['scale']) if site['address'] else "No address or bounding box"
+                if not isinstance(coords, list):
+                    row = _result_row(site)
+                    row['error'] = coords
+                    yield row
+                    continue
+                site = {**site, 'coords': coords}
+            if fallback:
+                fallback.append(site)
+                continue
+            try:
+                pending[executor.submit(screen_site, site)] = site
+            except BrokenProcessPool:
+                pool_broke(site)
+
+        for future in as_completed(list(pending)):
+            row = result_of(future)
+            if row is not None:
+                yield row
+
+        for site in fallback:
+            yield screen_site(site)
+    finally:
+        if owns_executor:
+            executor.shutdown(cancel_futures=True)
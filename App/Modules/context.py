@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+
+import geopandas as gpd
+import numpy as np
+
+from . import metrics
+from .coords import geocode
+from .landuse import get_land_use_data
+from .power import get_grid_distance_data
+from .solar import get_radiation_data
+from .wind import get_wind_data
+
+# Solar, wind, grid distance and the siting stage all share one rows x cols grid over the bounding box
+GRID_SIZE = 100
+
+@dataclass
+class SiteContext:
+    """Geocoded bounding box and every data layer for a single request."""
+    address: str
+    scale: int
+    coords: list
+    land_use_gdf: gpd.GeoDataFrame
+    lats: np.ndarray
+    lons: np.ndarray
+    radiation_levels: np.ndarray
+    wind_speeds: np.ndarray
+    wind_directions: np.ndarray
+    grid_distances: np.ndarray  # km to the nearest power infrastructure
+    data_version: str = ''
+    layers: dict = field(default_factory=dict, repr=False)  # Scoring layers per model version
+
+    @property
+    def center(self):
+        min_lat, max_lat, min_lon, max_lon = self.coords
+        return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+def fingerprint(land_use_gdf, *arrays) -> str:
+    """Content hash of the data layers, used to key rendered maps."""
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    if land_use_gdf is not None and not land_use_gdf.empty:
+        digest.update(b''.join(land_use_gdf.geometry.to_wkb().to_numpy()))
+        if 'landuse' in land_use_gdf.columns:
+            digest.update('\x1f'.join(land_use_gdf['landuse'].astype(str)).encode('utf-8'))
+    return digest.hexdigest()
+
+def build_site_context(address: str, scale: int = 50, grid_size: int = GRID_SIZE,
+                       coords: list | None = None, previous: SiteContext | None = None) -> SiteContext | str:
+    """Geocode the address and fetch land use, solar, wind and grid distance data exactly once.
+
+    The fetches only depend on the bounding box, so they run concurrently, each
+    recorded as a span in the current request metrics. Pass coords to skip
+    geocoding when the bounding box is already known, and the previous request's
+    context to reuse its land use where the bounding boxes overlap. Solar, wind
+    and grid distance are sampled afresh on the new grid; they are cheap to read.
+    """
+    if coords is None:
+        coords = metrics.spanned('geocode', geocode, address, scale)
+
+    if isinstance(coords, list):
+        shape = (grid_size, grid_size)
+        land_use_args = (coords,) if previous is None else (coords, (previous.land_use_gdf, previous.coords))
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            land_use = metrics.submit_in_context(pool, metrics.spanned, 'fetch land use', get_land_use_data, *land_use_args)
+            solar = metrics.submit_in_context(pool, metrics.spanned, 'fetch solar', get_radiation_data, coords, shape)
+            wind = metrics.submit_in_context(pool, metrics.spanned, 'fetch wind', get_wind_data, coords, shape)
+            power = metrics.submit_in_context(pool, metrics.spanned, 'fetch power', get_grid_distance_data, coords, shape)
+
+            land_use_gdf = land_use.result()
+            lats, lons, radiation_levels = solar.result()
+            _, _, wind_speeds, wind_directions = wind.result()
+            _, _, grid_distances = power.result()
+
+        with metrics.span('fingerprint'):
+            data_version = fingerprint(
+                land_use_gdf, lats, lons, radiation_levels, wind_speeds, wind_directions, grid_distances,
+            )
+
+        return SiteContext(
+            address=address,
+            scale=scale,
+            coords=coords,
+            land_use_gdf=land_use_gdf,
+            lats=lats,
+            lons=lons,
+            radiation_levels=radiation_levels,
+            wind_speeds=wind_speeds,
+            wind_directions=wind_directions,
+            grid_distances=grid_distances,
+            data_version=data_version,
+        )
+    else:
+        return coords  # This will be "Address not documented" if geocoding failed
@@ -1,12 +1,144 @@
 from geopy.geocoders import Nominatim
 from math import cos, radians
+from collections import OrderedDict
+from contextlib import closing
+import os
+import sqlite3
+import threading
+import time
+
+from . import metrics
+
+# Persistent geocode results live alongside the osmnx response cache
+GEOCODE_CACHE_PATH = os.path.join('cache', 'geocode.sqlite')
+GEOCODE_TTL = 30 * 24 * 3600  # Seconds before a cached result is looked up again
+GEOCODE_CACHE_MAX_ENTRIES = 10000
+GEOCODE_LRU_SIZE = 256
+
+# Nominatim's usage policy allows at most one request per second
+GEOCODE_RATE = 1.0
+
+# Set SUSTAINASITE_OFFLINE=1 to serve only cached results and never hit Nominatim
+OFFLINE_ENV = 'SUSTAINASITE_OFFLINE'
+
+class TokenBucket:
+    """Blocking token bucket shared by every session in the process."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+_geolocator = Nominatim(user_agent="The-Virtual-Sanctuary")
+_rate_limiter = TokenBucket(GEOCODE_RATE)
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+_miss_lock = threading.Lock()
+
+def is_offline() -> bool:
+    return os.environ.get(OFFLINE_ENV, '') not in ('', '0')
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: case and whitespace insensitive."""
+    return ' '.join(address.lower().split())
+
+def _connect():
+    os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(GEOCODE_CACHE_PATH, timeout=10)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS geocode '
+        '(address TEXT PRIMARY KEY, latitude REAL, longitude REAL, fetched_at REAL)'
+    )
+    return conn
+
+def _memory_get(key: str):
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            _memory_cache.move_to_end(key)
+        return entry
+
+def _memory_put(key: str, entry: tuple):
+    with _memory_lock:
+        _memory_cache[key] = entry
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > GEOCODE_LRU_SIZE:
+            _memory_cache.popitem(last=False)
+
+def _disk_get(key: str):
+    with closing(_connect()) as conn:
+        return conn.execute(
+            'SELECT latitude, longitude, fetched_at FROM geocode WHERE address = ?', (key,)
+        ).fetchone()
+
+def store_geocode(address: str, latitude: float, longitude: float, fetched_at: float | None = None):
+    """Write a result to both cache layers, e.g. to seed an offline deployment."""
+    key = normalize_address(address)
+    entry = (latitude, longitude, time.time() if fetched_at is None else fetched_at)
+    with closing(_connect()) as conn, conn:
+        conn.execute('INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)', (key, *entry))
+        # Drop the oldest entries once the cache grows past its cap
+        conn.execute(
+            'DELETE FROM geocode WHERE address NOT IN '
+            '(SELECT address FROM geocode ORDER BY fetched_at DESC LIMIT ?)',
+            (GEOCODE_CACHE_MAX_ENTRIES,)
+        )
+    _memory_put(key, entry)
+
+def lookup(address: str) -> tuple | None:
+    """Latitude and longitude for an address, served from cache where possible."""
+    key = normalize_address(address)
+    offline = is_offline()
+
+    def fresh(entry):
+        return entry is not None and (offline or time.time() - entry[2] < GEOCODE_TTL)
+
+    entry = _memory_get(key)
+    if not fresh(entry):
+        entry = _disk_get(key)
+        if entry is not None:
+            _memory_put(key, entry)
+
+    if fresh(entry):
+        metrics.count('geocode cache hit')
+        return entry[0], entry[1]
+    metrics.count('geocode cache miss')
+    if offline:
+        return None
+
+    # Serialize the remaining misses so concurrent sessions respect the rate limit
+    with _miss_lock:
+        entry = _memory_get(key)
+        if fresh(entry):
+            return entry[0], entry[1]
+
+        _rate_limiter.acquire()
+        with metrics.span('nominatim'):
+            location = _geolocator.geocode(address)
+        if location is None:
+            return None
+
+        store_geocode(address, location.latitude, location.longitude)
+        return location.latitude, location.longitude
 
 def geocode(address: str, scale: int = 50) -> list | str:
-    geolocator = Nominatim(user_agent="The-Virtual-Sanctuary")
-    location = geolocator.geocode(address)
+    location = lookup(address)
 
     if location:
-        latitude, longitude = location.latitude, location.longitude
+        latitude, longitude = location
         radius_deg = scale / 111  # Convert length in km to degrees
 
         min_lat = latitude - radius_deg
@@ -15,7 +147,6 @@ def geocode(address: str, scale: int = 50) -> list | str:
         max_lon = longitude + radius_deg / cos(radians(latitude))
 
         return [min_lat, max_lat, min_lon, max_lon]
-    
+
     else:
         return "Address not documented"
-
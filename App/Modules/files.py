@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+import os
+import uuid
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb'):
+    """Open a private temporary file that replaces path when the block completes.
+
+    Readers, including other sessions and worker processes, see either the old
+    file or the complete new one, never a partial write. The parent directory
+    is created if needed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -1,31 +1,85 @@
+from dataclasses import astuple
+
 import folium
 import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-import joblib
-import osmnx as ox
 import geopandas as gpd
-from shapely.geometry import Point
-
-# Assume we have these modules for getting wind and solar data
-from .wind import get_wind_map
-from .solar import get_radiation_map
-from .landuse import get_land_use_map
-
-def get_land_use_at_point(gdf, lat, lon):
-    """Get the land use type at a specific point."""
-    point = Point(lon, lat)
-    for idx, row in gdf.iterrows():
-        if row['geometry'].contains(point):
-            return row.get('landuse', 'unknown')
-    return 'unknown'
-
-def is_developable(land_use):
-    """Check if the land use type is suitable for renewable energy development."""
-    restricted_zones = ['residential', 'commercial', 'agricultural', 'forest']
-    return land_use not in restricted_zones
 
+from . import metrics
+from .htmlcache import cached_html
+from .landuse import POLYGON_TYPES
+from .power import GRID_DISTANCE_MAX_KM, KM_PER_DEGREE_LAT, KM_PER_DEGREE_LON, add_grid_distance_layer, grid_distance
+from .providers import RADIATION, WIND_DIRECTION, WIND_SPEED, get_provider
+from .registry import load_active_model
+from .scoring import (
+    RADIATION_RANGE, WIND_SPEED_RANGE, SiteCriteria,
+    environment_layer, land_availability_layer, normalize, suitability,
+)
+
+RESTRICTED_ZONES = ['residential', 'commercial', 'agricultural', 'forest']
+
+# One record per grid cell; MODEL_FEATURES are the classifier inputs, in order
+FEATURE_DTYPE = np.dtype([
+    ('lat', 'f8'),
+    ('lon', 'f8'),
+    ('wind_speed', 'f8'),
+    ('wind_direction', 'f8'),
+    ('radiation', 'f8'),
+])
+MODEL_FEATURES = ['wind_speed', 'wind_direction', 'radiation']
+
+# 'grid' scores every cell of the shared site grid; 'hierarchical' searches coarse to fine
+# and scales with the number of promising regions rather than the area; 'auto' picks by scale
+SITE_SEARCH_MODE = 'auto'
+HIERARCHICAL_MIN_SCALE = 75  # km
+
+# Coarse-to-fine search: score SEARCH_COARSE_SIZE^2 cells, then split the best SEARCH_TOP_K
+# into SEARCH_REFINE_FACTOR^2 children each level until cells are SEARCH_TARGET_CELL_KM wide
+SEARCH_COARSE_SIZE = 160
+SEARCH_REFINE_FACTOR = 4
+SEARCH_TOP_K = 64
+SEARCH_TARGET_CELL_KM = 0.5
+
+@metrics.traced('land use join')
+def get_land_use_labels(gdf, lats, lons):
+    """Get the land use type for every point with one bulk spatial index query.
+
+    Returns an object array aligned with the flattened lats/lons. Where polygons
+    overlap, restricted zones win over everything else, then the earliest row in
+    the GeoDataFrame, so the label never depends on query order.
+    """
+    lats = np.asarray(lats, dtype=float).ravel()
+    lons = np.asarray(lons, dtype=float).ravel()
+    labels = np.full(lats.shape, 'unknown', dtype=object)
+
+    if gdf is None or gdf.empty or 'landuse' not in gdf.columns:
+        return labels
+
+    polygons = gdf[gdf.geom_type.isin(POLYGON_TYPES)]
+    if polygons.empty:
+        return labels
+
+    points = gpd.GeoSeries(gpd.points_from_xy(lons, lats), crs=polygons.crs)
+    point_idx, poly_idx = polygons.sindex.query(points, predicate='within')
+    if len(point_idx) == 0:
+        return labels
+
+    land_use = polygons['landuse'].fillna('unknown').astype(str).to_numpy(dtype=object)
+    priority = np.where(np.isin(land_use, RESTRICTED_ZONES), 0, 1)
+
+    # Sort hits by point, then priority, then row order and keep the first per point
+    order = np.lexsort((poly_idx, priority[poly_idx], point_idx))
+    point_idx, poly_idx = point_idx[order], poly_idx[order]
+    first = np.ones(len(point_idx), dtype=bool)
+    first[1:] = point_idx[1:] != point_idx[:-1]
+    labels[point_idx[first]] = land_use[poly_idx[first]]
+
+    return labels
+
+@metrics.traced('train')
 def train_site_classifier(data, labels):
     """Train a Random Forest classifier to identify suitable sites."""
     X_train, X_test, y_train, y_test = train_test_split(data, labels, test_size=0.2, random_state=42)
@@ -41,87 +95,248 @@ def train_site_classifier(data, labels):
     
     return clf, scaler
 
+@metrics.traced('predict')
 def predict_suitable_sites(clf, scaler, features):
     """Use the trained classifier to predict suitable sites."""
     features_scaled = scaler.transform(features)
     return clf.predict_proba(features_scaled)[:, 1]  # Probability of positive class
 
-def create_ml_renewable_energy_map(address: str, scale: int = 50):
-    # Get wind and solar data
-    wind_data = get_wind_map(address, scale)
-    solar_data = get_radiation_map(address, scale)
+@metrics.traced('assemble features')
+def grid_cells(ctx):
+    """One FEATURE_DTYPE record and one land use label per cell of the site grid."""
+    # Every layer's [i, j] is measured at (lats[i], lons[j])
+    lon_grid, lat_grid = np.meshgrid(ctx.lons, ctx.lats)
+
+    cells = np.empty(lat_grid.size, dtype=FEATURE_DTYPE)
+    cells['lat'] = lat_grid.ravel()
+    cells['lon'] = lon_grid.ravel()
+    cells['wind_speed'] = ctx.wind_speeds.ravel()
+    cells['wind_direction'] = ctx.wind_directions.ravel()
+    cells['radiation'] = ctx.radiation_levels.ravel()
+
+    return cells, get_land_use_labels(ctx.land_use_gdf, cells['lat'], cells['lon'])
+
+def assemble_features(ctx):
+    """Build features and placeholder labels for every developable cell of the site grid.
+
+    Returns a structured array with one record per developable cell and the
+    matching label array. MODEL_FEATURES selects the classifier's input columns.
+    """
+    cells, land_uses = grid_cells(ctx)
+    cells = cells[developable_cells(cells, land_uses)]
+
+    # In practice, you would use real labels here
+    # This is just a placeholder
+    mean_wind_speed = np.nanmean(ctx.wind_speeds)
+    mean_radiation = np.nanmean(ctx.radiation_levels)
+    labels = ((cells['wind_speed'] > mean_wind_speed) | (cells['radiation'] > mean_radiation)).astype(int)
+
+    return cells, labels
+
+def feature_matrix(cells):
+    """Plain 2-D float matrix of the classifier's input columns."""
+    return structured_to_unstructured(cells[MODEL_FEATURES])
+
+def developable_cells(cells, land_uses) -> np.ndarray:
+    """Mask of cells outside restricted zones that have resource data.
+
+    Providers return NaN where they have no data, e.g. outside a raster's
+    coverage; such cells can be neither predicted nor scored.
+    """
+    return ~np.isin(land_uses, RESTRICTED_ZONES) & np.isfinite(feature_matrix(cells)).all(axis=1)
+
+def point_layers(cells, land_uses, grid_distances, land_use_gdf, model) -> dict:
+    """Criteria layers for any set of developable cells, each scaled to [0, 1]."""
+    _, clf, scaler = model
+    return {
+        'cells': cells,
+        'solar': normalize(cells['radiation'], *RADIATION_RANGE),
+        'wind': normalize(cells['wind_speed'], *WIND_SPEED_RANGE),
+        'model': predict_suitable_sites(clf, scaler, feature_matrix(cells)) if len(cells) else np.empty(0),
+        'land': land_availability_layer(land_uses),
+        'grid': 1 - normalize(grid_distances, 0, GRID_DISTANCE_MAX_KM),
+        'environment': environment_layer(cells['lat'], cells['lon'], land_use_gdf),
+    }
+
+def get_layers(ctx, model):
+    """Criteria layers for every developable cell of the site grid.
+
+    These only depend on the site data and the model, so they are computed once
+    and kept on the context; changing the form's weights reuses them.
+    """
+    model_version = model[0]
+    if model_version not in ctx.layers:
+        cells, land_uses = grid_cells(ctx)
+        developable = developable_cells(cells, land_uses)
+        ctx.layers[model_version] = point_layers(
+            cells[developable], land_uses[developable], ctx.grid_distances.ravel()[developable],
+            ctx.land_use_gdf, model,
+        )
+    return ctx.layers[model_version]
+
+def _sample_cells(provider, lats, lons):
+    """FEATURE_DTYPE records for every (lats[i], lons[j]) of a small grid, straight from the provider."""
+    lon_grid, lat_grid = np.meshgrid(lons, lats)
+    cells = np.empty(lat_grid.size, dtype=FEATURE_DTYPE)
+    cells['lat'] = lat_grid.ravel()
+    cells['lon'] = lon_grid.ravel()
+    cells['wind_speed'] = provider.sample(WIND_SPEED, lats, lons).ravel()
+    cells['wind_direction'] = provider.sample(WIND_DIRECTION, lats, lons).ravel()
+    cells['radiation'] = provider.sample(RADIATION, lats, lons).ravel()
+    return cells
+
+def _score_cells(ctx, cells, model, criteria: SiteCriteria):
+    """Drop undevelopable cells and score the rest. Returns (cells, suitability_scores)."""
+    land_uses = get_land_use_labels(ctx.land_use_gdf, cells['lat'], cells['lon'])
+    developable = developable_cells(cells, land_uses)
+    cells = cells[developable]
+    layers = point_layers(
+        cells, land_uses[developable], grid_distance(cells['lat'], cells['lon']), ctx.land_use_gdf, model,
+    )
+    return cells, suitability(layers, criteria)
+
+def _cell_centres(start: float, stop: float, count: int) -> np.ndarray:
+    step = (stop - start) / count
+    return start + (np.arange(count) + 0.5) * step
+
+def grid_search(ctx, model, criteria: SiteCriteria | None = None, size: int = SEARCH_COARSE_SIZE):
+    """Score the centres of a uniform size x size grid over the bounding box.
+
+    The brute-force reference for hierarchical_search. Returns (cells, suitability_scores).
+    """
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    cells = _sample_cells(get_provider(), _cell_centres(min_lat, max_lat, size), _cell_centres(min_lon, max_lon, size))
+    return _score_cells(ctx, cells, model, criteria or SiteCriteria())
+
+@metrics.traced('hierarchical search')
+def hierarchical_search(ctx, model, criteria: SiteCriteria | None = None,
+                        coarse_size: int = SEARCH_COARSE_SIZE, factor: int = SEARCH_REFINE_FACTOR,
+                        top_k: int = SEARCH_TOP_K, target_km: float = SEARCH_TARGET_CELL_KM):
+    """Coarse-to-fine search for the best cells, down to cells about target_km wide.
+
+    Scores a coarse_size x coarse_size grid, then repeatedly splits the top_k
+    cells into factor x factor children and scores only those, so the work per
+    level is fixed whatever the area. Cell centres line up with a uniform grid
+    of coarse_size * factor**levels, which grid_search can check against.
+    Returns (cells, suitability_scores) for the finest level.
+    """
+    criteria = criteria or SiteCriteria()
+    provider = get_provider()
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    cell_lat = (max_lat - min_lat) / coarse_size
+    cell_lon = (max_lon - min_lon) / coarse_size
+    km_per_lon = KM_PER_DEGREE_LON * np.cos(np.radians(ctx.center[0]))
+
+    cells = _sample_cells(
+        provider, _cell_centres(min_lat, max_lat, coarse_size), _cell_centres(min_lon, max_lon, coarse_size),
+    )
+    cells, scores = _score_cells(ctx, cells, model, criteria)
+
+    while max(cell_lat * KM_PER_DEGREE_LAT, cell_lon * km_per_lon) > target_km and len(cells):
+        best = cells[np.argsort(scores)[::-1][:top_k]]
+        cell_lat, cell_lon = cell_lat / factor, cell_lon / factor
+        offsets = np.arange(factor) - (factor - 1) / 2
+
+        children = [
+            _sample_cells(provider, cell['lat'] + offsets * cell_lat, cell['lon'] + offsets * cell_lon)
+            for cell in best
+        ]
+        cells, scores = _score_cells(ctx, np.concatenate(children), model, criteria)
+
+    return cells, scores
+
+def search_mode(scale: int, mode: str = SITE_SEARCH_MODE) -> str:
+    """Resolve 'auto' to 'hierarchical' for large scales and 'grid' otherwise."""
+    if mode == 'auto':
+        return 'hierarchical' if scale >= HIERARCHICAL_MIN_SCALE else 'grid'
+    return mode
+
+def score_sites(ctx, model, criteria: SiteCriteria | None = None, mode: str = 'grid'):
+    """Score candidate cells against the criteria and mark the top 10% as suitable.
+
+    model is a (version, clf, scaler) tuple from load_active_model. 'grid' scores
+    every developable cell of the site grid, 'hierarchical' the finest cells of
+    hierarchical_search. Returns (cells, suitability_scores, selected).
+    """
+    criteria = criteria or SiteCriteria()
+    if mode == 'hierarchical':
+        cells, suitability_scores = hierarchical_search(ctx, model, criteria)
+    else:
+        layers = get_layers(ctx, model)
+        cells = layers['cells']
+        suitability_scores = suitability(layers, criteria) if len(cells) else np.empty(0)
+
+    if not len(cells):
+        return cells, np.empty(0), np.zeros(0, dtype=bool)
+
+    threshold = np.percentile(suitability_scores, 90)  # Top 10% of suitable locations
+    return cells, suitability_scores, suitability_scores >= threshold
+
+def build_ml_renewable_energy_map(ctx, model, criteria: SiteCriteria | None = None, mode: str = 'grid'):
+    """Build the suitable-site map for a SiteContext with the given model and criteria."""
+    criteria = criteria or SiteCriteria()
+    cells, suitability_scores, selected = score_sites(ctx, model, criteria, mode)
+    
+    # Create a map centered on the location
+    center_lat, center_lon = ctx.center
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
+
+    # Distance to the power grid, off until switched on in the layer control
+    add_grid_distance_layer(m, ctx)
+    folium.LayerControl().add_to(m)
     
-    # Get land use data
-    land_use_map, land_use_gdf = get_land_use_map(address, scale)
+    if len(cells):
+        # Add markers for highly suitable locations, typed by the stronger resource for hybrids
+        if criteria.site_type == 'Hybrid':
+            is_wind = normalize(cells['wind_speed'], *WIND_SPEED_RANGE) > normalize(cells['radiation'], *RADIATION_RANGE)
+        else:
+            is_wind = np.full(len(cells), criteria.site_type == 'Wind')
+
+        # One GeoJSON layer per icon; a folium Marker per site takes over a second to render at 1000 sites
+        for wind, icon in [(True, '🎐'), (False, '☀️')]:
+            chosen = selected & (is_wind == wind)
+            if not chosen.any():
+                continue
+            features = [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [float(lon), float(lat)]},
+                    'properties': {'score': f"{score:.2f}"},
+                }
+                for lat, lon, score in zip(cells['lat'][chosen], cells['lon'][chosen], suitability_scores[chosen])
+            ]
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': features},
+                marker=folium.Marker(icon=folium.DivIcon(html=f'<div style="font-size: 24px;">{icon}</div>')),
+                tooltip=folium.GeoJsonTooltip(fields=['score'], aliases=['Suitability Score:']),
+                control=False,
+            ).add_to(m)
     
-    if isinstance(wind_data, tuple) and isinstance(solar_data, tuple):
-        wind_file, wind_lats, wind_lons, wind_speeds, wind_directions = wind_data
-        solar_file, solar_lats, solar_lons, radiation_levels = solar_data
-        
-        # Combine all features
-        features = []
-        labels = []
-        valid_lats = []
-        valid_lons = []
-        
-        for lat, lon, wind_speed, wind_direction, radiation in zip(
-            wind_lats.flatten(), wind_lons.flatten(), 
-            wind_speeds.flatten(), wind_directions.flatten(), 
-            radiation_levels.flatten()
-        ):
-            land_use = get_land_use_at_point(land_use_gdf, lat, lon)
-            if is_developable(land_use):
-                features.append([wind_speed, wind_direction, radiation])
-                valid_lats.append(lat)
-                valid_lons.append(lon)
-                
-                # In practice, you would use real labels here
-                # This is just a placeholder
-                labels.append(1 if (wind_speed > np.mean(wind_speeds) or radiation > np.mean(radiation_levels)) else 0)
-        
-        features = np.array(features)
-        labels = np.array(labels)
-        
-        # Train the classifier
-        clf, scaler = train_site_classifier(features, labels)
-        
-        # Predict suitability for all sites
-        suitability_scores = predict_suitable_sites(clf, scaler, features)
-        
-        # Create a map centered on the location
-        center_lat = (np.min(wind_lats) + np.max(wind_lats)) / 2
-        center_lon = (np.min(wind_lons) + np.max(wind_lons)) / 2
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
-        
-        # Add markers for highly suitable locations
-        threshold = np.percentile(suitability_scores, 90)  # Top 10% of suitable locations
-        for lat, lon, score, wind_speed, radiation in zip(valid_lats, valid_lons, suitability_scores, features[:, 0], features[:, 2]):
-            if score >= threshold:
-                icon_html = '<div style="font-size: 24px;">🎐</div>' if wind_speed > np.mean(features[:, 0]) else '<div style="font-size: 24px;">☀️</div>'
-                folium.Marker(
-                    [lat, lon],
-                    icon=folium.DivIcon(html=icon_html),
-                    tooltip=f"Suitability Score: {score:.2f}"
-                ).add_to(m)
-        
-        # Add a legend
-        legend_html = '''
-        <div style="position: fixed; bottom: 50px; left: 50px; width: 250px; 
-        border:2px solid grey; z-index:9999; font-size:14px; background-color:white;">
-            <p style="margin: 5px;"><span style="font-size: 24px;">🎐</span> Potential Wind Farm Location</p>
-            <p style="margin: 5px;"><span style="font-size: 24px;">☀️</span> Potential Solar Farm Location</p>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
-        
-        # Save the map
-        map_file = f'tmp/{address}_ml_renewable_energy_map.html'
-        m.save(map_file)
-        
-        # Save the trained model for future use
-        joblib.dump(clf, 'renewable_energy_site_classifier.joblib')
-        joblib.dump(scaler, 'feature_scaler.joblib')
-        
-        return map_file
-    else:
-        return "Error: Could not retrieve wind or solar data"
+    # Add a legend
+    legend_html = '''
+    <div style="position: fixed; bottom: 50px; left: 50px; width: 250px; 
+    border:2px solid grey; z-index:9999; font-size:14px; background-color:white;">
+        <p style="margin: 5px;"><span style="font-size: 24px;">🎐</span> Potential Wind Farm Location</p>
+        <p style="margin: 5px;"><span style="font-size: 24px;">☀️</span> Potential Solar Farm Location</p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    
+    return m
+
+def create_ml_renewable_energy_map(ctx, criteria: SiteCriteria | None = None) -> str:
+    """Rendered HTML of the suitable-site map, using the active model version."""
+    model = load_active_model()
+    if model is None:
+        return "Error: No trained site classifier, run `python App/train.py` first"
+    criteria = criteria or SiteCriteria()
+    mode = search_mode(ctx.scale)
+    version = (model[0], *astuple(criteria), mode)
+    if mode == 'hierarchical':
+        version += (SEARCH_COARSE_SIZE, SEARCH_REFINE_FACTOR, SEARCH_TOP_K, SEARCH_TARGET_CELL_KM)
+
+    return cached_html(
+        'ml_renewable_energy', ctx,
+        lambda ctx: build_ml_renewable_energy_map(ctx, model, criteria, mode),
+        *version,
+    )
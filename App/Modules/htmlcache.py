@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+from . import metrics
+from .files import atomic_write
+
+# Rendered maps are cached by content key, so concurrent sessions never share a file name
+HTML_CACHE_DIR = os.path.join('tmp', 'html')
+HTML_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Set SUSTAINASITE_HTML_CACHE=0 to render every map in memory without touching disk
+HTML_CACHE_ENV = 'SUSTAINASITE_HTML_CACHE'
+
+def is_enabled() -> bool:
+    return os.environ.get(HTML_CACHE_ENV, '1') != '0'
+
+def cache_key(*parts) -> str:
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def _evict(max_bytes: int):
+    """Delete the least recently used maps until the cache fits in max_bytes."""
+    entries = []
+    with os.scandir(HTML_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.html'):
+                # Render workers evict concurrently, so another may have just removed this map
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def _render(kind: str, ctx, build) -> str:
+    with metrics.span(f'build {kind}'):
+        m = build(ctx)
+    with metrics.span(f'serialize {kind}'):
+        html = m.get_root().render()
+    metrics.size(kind, len(html))
+    return html
+
+def cached_html(kind: str, ctx, build, *version) -> str:
+    """Rendered HTML for a map, keyed by (kind, address, scale, data version, *version).
+
+    build(ctx) must return a folium object; it is only called on a cache miss.
+    """
+    if not is_enabled():
+        return _render(kind, ctx, build)
+
+    key = cache_key(kind, ctx.address, ctx.scale, ctx.data_version, *version)
+    path = os.path.join(HTML_CACHE_DIR, f'{key}.html')
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+    except FileNotFoundError:
+        metrics.count('html cache miss')
+    else:
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except FileNotFoundError:
+            pass  # Evicted by another worker since it was read
+        metrics.count('html cache hit')
+        metrics.size(kind, len(html))
+        return html
+
+    html = _render(kind, ctx, build)
+
+    with atomic_write(path, 'w') as f:
+        f.write(html)
+    _evict(HTML_CACHE_MAX_BYTES)
+
+    return html
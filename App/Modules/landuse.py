@@ -1,83 +1,123 @@
 import folium
-import osmnx as ox
-from .coords import geocode
-
-def get_land_use_map(address: str, scale: int = 50):
-    coords = geocode(address, scale)
-    
-    if isinstance(coords, list):
-        min_lat, max_lat, min_lon, max_lon = coords
-        center_lat = (min_lat + max_lat) / 2
-        center_lon = (min_lon + max_lon) / 2
-
-        # Create a map centered on the location
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=12)
-
-        # Fetch land use data from OpenStreetMap
-        north, south, east, west = max_lat, min_lat, max_lon, min_lon
-        gdf = ox.geometries_from_bbox(north, south, east, west, tags={'landuse': True})
-
-        # Define color scheme for different land use types
-        color_map = {
-            'residential': 'red',
-            'commercial': 'blue',
-            'industrial': 'purple',
-            'agricultural': 'green',
-            'forest': 'darkgreen',
-            'grass': 'lightgreen',
-            'water': 'lightblue'
-        }
-
-        # Add land use polygons to the map
-        for idx, row in gdf.iterrows():
-            if 'landuse' in row:
-                landuse = row['landuse']
-                color = color_map.get(landuse, 'gray')  # Default to gray for unknown land use types
-                folium.GeoJson(
-                    row['geometry'],
-                    style_function=lambda x, color=color: {
-                        'fillColor': color,
-                        'color': 'black',
-                        'weight': 1,
-                        'fillOpacity': 0.7
-                    },
-                    tooltip=landuse
-                ).add_to(m)
-
-
-        # Add a rectangle to show the bounding box
-        folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]], 
-                         fill=False, 
-                         color='black',
-                         weight=2).add_to(m)
-
-        # Add a legend
-        legend_html = '''
-        <div style="position: fixed; bottom: 50px; left: 50px; width: 120px; height: 180px; 
-        border:2px solid grey; z-index:9999; font-size:14px; background-color:white;
-        ">&nbsp; Land Use Types<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:red"></i> Residential<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:blue"></i> Commercial<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:purple"></i> Industrial<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:green"></i> Agricultural<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:darkgreen"></i> Forest<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:lightgreen"></i> Grass<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:lightblue"></i> Water<br>
-        &nbsp; <i class="fa fa-square fa-1x" style="color:gray"></i> Other
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
-
-        # Save the map to an HTML file
-        map_file = f'tmp/{address}_land_use_map.html'
-        m.save(map_file)
-
-        return map_file, gdf
-    else:
-        return coords  # This will be "Address not documented" if geocoding failed
-    
+import shapely
+from shapely.geometry import box
+from .htmlcache import cached_html
+from .tiles import extend_features, load_features
+
+# Geometry types that can actually contain a point or be filled on the map
+POLYGON_TYPES = ['Polygon', 'MultiPolygon']
+
+LAND_USE_ZOOM = 12
+
+# Merge all polygons of a class into one feature; fewer features, but no per-polygon tooltips
+LAND_USE_DISSOLVE = False
+
+# Define color scheme for different land use types
+LAND_USE_COLORS = {
+    'residential': 'red',
+    'commercial': 'blue',
+    'industrial': 'purple',
+    'agricultural': 'green',
+    'forest': 'darkgreen',
+    'grass': 'lightgreen',
+    'water': 'lightblue'
+}
+
+def get_land_use_data(coords: list, previous: tuple | None = None):
+    """Land use features for the bounding box, served from the local OSM tile store.
+
+    previous is an earlier (features, bounding box) to reuse where the boxes overlap.
+    """
+    if previous is not None:
+        return extend_features('landuse', {'landuse': True}, coords, *previous)
+    return load_features('landuse', {'landuse': True}, coords)
+
+def simplify_tolerance(zoom: int) -> float:
+    """Half a screen pixel at the given zoom level, in degrees."""
+    return 360 / (256 * 2 ** zoom) / 2
+
+def prepare_land_use(gdf, coords: list, zoom: int = LAND_USE_ZOOM, dissolve: bool = LAND_USE_DISSOLVE):
+    """Reduce land use features to what the map can show at this zoom.
+
+    Keeps only polygons with a landuse tag, clips them to the bounding box,
+    simplifies them (topology-preserving) to about one pixel and rounds
+    coordinates to that precision.
+    """
+    if gdf is None or gdf.empty or 'landuse' not in gdf.columns:
+        return None
+
+    gdf = gdf[gdf.geom_type.isin(POLYGON_TYPES) & gdf['landuse'].notna()]
+    gdf = gdf[['landuse', 'geometry']].reset_index(drop=True)
+
+    min_lat, max_lat, min_lon, max_lon = coords
+    gdf_min_lon, gdf_min_lat, gdf_max_lon, gdf_max_lat = gdf.total_bounds
+    if gdf_min_lon < min_lon or gdf_min_lat < min_lat or gdf_max_lon > max_lon or gdf_max_lat > max_lat:
+        gdf = gdf.clip(box(min_lon, min_lat, max_lon, max_lat))
+
+    tolerance = simplify_tolerance(zoom)
+    geometry = shapely.simplify(gdf.geometry.values, tolerance, preserve_topology=True)
+    gdf = gdf.set_geometry(shapely.set_precision(geometry, tolerance))
+    gdf = gdf[~gdf.geometry.is_empty]
+
+    if dissolve:
+        gdf = gdf.dissolve(by='landuse', as_index=False)
+
+    return gdf if not gdf.empty else None
+
+def build_land_use_map(ctx, dissolve: bool = LAND_USE_DISSOLVE):
+    """Build the land use map for a SiteContext."""
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    center_lat, center_lon = ctx.center
+
+    # Create a map centered on the location
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=LAND_USE_ZOOM)
+
+    # Add every land use polygon as one FeatureCollection, styled by its landuse class
+    gdf = prepare_land_use(ctx.land_use_gdf, ctx.coords, dissolve=dissolve)
+    if gdf is not None:
+        folium.GeoJson(
+            gdf,
+            style_function=lambda feature: {
+                'fillColor': LAND_USE_COLORS.get(feature['properties']['landuse'], 'gray'),  # Default to gray for unknown land use types
+                'color': 'black',
+                'weight': 1,
+                'fillOpacity': 0.7
+            },
+            tooltip=folium.GeoJsonTooltip(fields=['landuse'], labels=False)
+        ).add_to(m)
+
+    # Add a rectangle to show the bounding box
+    folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]], 
+                     fill=False, 
+                     color='black',
+                     weight=2).add_to(m)
+
+    # Add a legend
+    legend_html = '''
+    <div style="position: fixed; bottom: 50px; left: 50px; width: 120px; height: 180px; 
+    border:2px solid grey; z-index:9999; font-size:14px; background-color:white;
+    ">&nbsp; Land Use Types<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:red"></i> Residential<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:blue"></i> Commercial<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:purple"></i> Industrial<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:green"></i> Agricultural<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:darkgreen"></i> Forest<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:lightgreen"></i> Grass<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:lightblue"></i> Water<br>
+    &nbsp; <i class="fa fa-square fa-1x" style="color:gray"></i> Other
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+
+    return m
+
+def get_land_use_map(ctx) -> str:
+    """Rendered HTML of the land use map."""
+    return cached_html('land_use', ctx, build_land_use_map, LAND_USE_ZOOM, LAND_USE_DISSOLVE)
+
 if __name__ == "__main__":
+    from .context import build_site_context
 
     address = "New York, NY"
-    map_file = get_land_use_map(address, scale=10)
-    print(f"Land use map saved as: {map_file}")
\ No newline at end of file
+    html = get_land_use_map(build_site_context(address, scale=10))
+    print(f"Land use map rendered: {len(html)} bytes")
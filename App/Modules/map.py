@@ -1,27 +1,25 @@
-from .coords import geocode
 import folium
+from .htmlcache import cached_html
 
-def get_map(address: str, scale: int = 50):
-    coords = geocode(address, scale)
-    
-    if isinstance(coords, list):
-        min_lat, max_lat, min_lon, max_lon = coords
-        center_lat = (min_lat + max_lat) / 2
-        center_lon = (min_lon + max_lon) / 2
+def build_map(ctx):
+    """Build the site location map for a SiteContext."""
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    center_lat, center_lon = ctx.center
 
-        # Create a map centered on the location
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
+    # Create a map centered on the location
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
 
-        # Add a marker for the center point
-        folium.Marker([center_lat, center_lon], popup=address).add_to(m)
+    # Add a marker for the center point
+    folium.Marker([center_lat, center_lon], popup=ctx.address).add_to(m)
 
-        # Add a rectangle to show the bounding box
-        folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]], 
-                         fill=True, 
-                         fill_color='red', 
-                         fill_opacity=0.05).add_to(m)
+    # Add a rectangle to show the bounding box
+    folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]], 
+                     fill=True, 
+                     fill_color='red', 
+                     fill_opacity=0.05).add_to(m)
 
-        # Save the map to an HTML file
-        map_file = f'tmp/{address}_map.html'
-        m.save(map_file)
+    return m
 
+def get_map(ctx) -> str:
+    """Rendered HTML of the site location map."""
+    return cached_html('map', ctx, build_map)
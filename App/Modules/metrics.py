@@ -0,0 +1,204 @@
+from contextlib import contextmanager
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+# Set SUSTAINASITE_PROFILE to 'cprofile' or 'pyinstrument' to profile every request by default
+PROFILE_ENV = 'SUSTAINASITE_PROFILE'
+PROFILERS = ['off', 'cprofile', 'pyinstrument']
+PROFILE_TOP = 40  # Functions listed in a cProfile report
+
+# Python 3.12 allows one cProfile profiler per process, so requests take turns
+_cprofile_lock = threading.Lock()
+
+# One JSON line per request on stderr, without the server's log prefix
+logger = logging.getLogger('sustainasite.metrics')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+class RequestMetrics:
+    """Spans, counters and output sizes collected while serving one request.
+
+    Safe to record into from several threads; worker processes collect their
+    own and send them back with to_dict so the parent can merge them.
+    """
+
+    def __init__(self):
+        self.spans = []      # (name, seconds), in completion order
+        self.counters = {}   # name -> count
+        self.sizes = {}      # name -> bytes
+        self.profile = ''
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.spans.append((name, seconds))
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def size(self, name: str, nbytes: int):
+        with self._lock:
+            self.sizes[name] = nbytes
+
+    def timings(self) -> dict:
+        """Total seconds per span name."""
+        totals = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0) + seconds
+        return totals
+
+    def calls(self) -> dict:
+        """Number of spans per span name."""
+        totals = {}
+        for name, _ in self.spans:
+            totals[name] = totals.get(name, 0) + 1
+        return totals
+
+    def merge(self, other: dict):
+        """Add metrics from another RequestMetrics.to_dict(), e.g. from a worker process."""
+        for name, seconds in other['spans']:
+            self.record(name, seconds)
+        for name, n in other['counters'].items():
+            self.count(name, n)
+        for name, nbytes in other['sizes'].items():
+            self.size(name, nbytes)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {'spans': list(self.spans), 'counters': dict(self.counters), 'sizes': dict(self.sizes)}
+
+_current = contextvars.ContextVar('sustainasite_metrics', default=None)
+
+def current() -> RequestMetrics | None:
+    return _current.get()
+
+@contextmanager
+def collect():
+    """Collect metrics for everything run in this context until the block exits."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def span(name: str):
+    """Time a block into the current request's metrics, if any are being collected."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.record(name, time.perf_counter() - start)
+
+def spanned(name: str, fn, *args):
+    """Call fn(*args) inside span(name) and return its result."""
+    with span(name):
+        return fn(*args)
+
+def traced(name: str):
+    """Decorator recording every call of a function as a span."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name: str, n: int = 1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, n)
+
+def size(name: str, nbytes: int):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.size(name, nbytes)
+
+def submit_in_context(pool, fn, *args):
+    """pool.submit for threads, carrying the current metrics into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+def default_profiler() -> str:
+    profiler = os.environ.get(PROFILE_ENV, 'off').lower()
+    return profiler if profiler in PROFILERS else 'off'
+
+@contextmanager
+def profile(profiler: str):
+    """Profile the calling thread into the current metrics' profile report.
+
+    'pyinstrument' falls back to cProfile when pyinstrument is not installed.
+    Only one request is profiled with cProfile at a time; the others run
+    unprofiled with a note in the report. Work done in worker processes and
+    threads is not captured.
+    """
+    metrics = _current.get()
+    if profiler == 'off' or metrics is None:
+        yield
+        return
+
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            profiler = 'cprofile'
+        else:
+            sampler = Profiler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                metrics.profile = sampler.output_text(unicode=True)
+            return
+
+    if not _cprofile_lock.acquire(blocking=False):
+        metrics.profile = "Not profiled: another request is being profiled with cProfile"
+        yield
+        return
+
+    try:
+        tracer = cProfile.Profile()
+        try:
+            tracer.enable()
+        except ValueError as e:
+            # Another tool, e.g. a debugger, holds the interpreter's profiler
+            metrics.profile = f"Not profiled: {e}"
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            tracer.disable()
+            report = io.StringIO()
+            pstats.Stats(tracer, stream=report).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            metrics.profile = report.getvalue()
+    finally:
+        _cprofile_lock.release()
+
+def log_request(metrics: RequestMetrics, **fields):
+    """Write one structured JSON line summarizing a request."""
+    record = {
+        **fields,
+        'timings': {name: round(seconds, 4) for name, seconds in metrics.timings().items()},
+        'counters': metrics.counters,
+        'html_bytes': metrics.sizes,
+    }
+    logger.info(json.dumps(record, default=str))
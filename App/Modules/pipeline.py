@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+import time
+
+from . import metrics
+from .final_map import create_ml_renewable_energy_map
+from .landuse import get_land_use_map
+from .map import get_map
+from .providers import get_provider
+from .registry import load_active_model
+from .solar import get_radiation_map
+from .wind import get_wind_map
+
+MAP_RENDERERS = {
+    'map': get_map,
+    'land_use': get_land_use_map,
+    'radiation': get_radiation_map,
+    'wind': get_wind_map,
+    'ml_renewable_energy': create_ml_renewable_energy_map,
+}
+
+# Set SUSTAINASITE_RENDER_WORKERS=0 to render in the calling process
+RENDER_WORKERS = int(os.environ.get('SUSTAINASITE_RENDER_WORKERS', min(len(MAP_RENDERERS), os.cpu_count() or 1)))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """Process pool shared by every session; workers keep their imports and loaded model."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # Spawn rather than fork, the Streamlit server process is multi-threaded
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _render_pool
+
+def reset_render_pool(pool):
+    """Drop a broken render pool so the next get_render_pool starts a fresh one.
+
+    Does nothing if pool has already been replaced, e.g. by another session.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+def _warm_worker() -> int:
+    # Unpickling this function imports every renderer in the worker
+    load_active_model()
+    return os.getpid()
+
+def warm_up():
+    """Load what the first request would otherwise wait for: the model, the data provider and the render workers."""
+    load_active_model()
+    get_provider()
+    if RENDER_WORKERS > 0:
+        pool = get_render_pool()
+        # One task per worker makes the pool start all of them
+        for future in [pool.submit(_warm_worker) for _ in range(RENDER_WORKERS)]:
+            future.result()
+
+def _render_args(name: str, ctx, criteria) -> tuple:
+    # Only the suitable-site map depends on the form's criteria
+    return (ctx, criteria) if name == 'ml_renewable_energy' else (ctx,)
+
+def _timed(fn, *args) -> tuple:
+    """Call fn(*args) and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def render_map(name: str, *args) -> tuple:
+    """Render one map, returning (html, seconds, metrics) so a worker's metrics reach the request."""
+    with metrics.collect() as collected:
+        html, seconds = _timed(MAP_RENDERERS[name], *args)
+    return html, seconds, collected.to_dict()
+
+def _finish(name: str, result: tuple) -> tuple:
+    html, seconds, worker_metrics = result
+    request_metrics = metrics.current()
+    if request_metrics is not None:
+        request_metrics.merge(worker_metrics)
+        request_metrics.record(f'render {name}', seconds)
+    return name, html, seconds
+
+def _submit_renders(pool, names: list, ctx, criteria) -> dict:
+    return {pool.submit(render_map, name, *_render_args(name, ctx, criteria)): name for name in names}
+
+def render_maps(ctx, names: list | None = None, criteria=None):
+    """Render maps concurrently, yielding (name, html, seconds) as each one finishes.
+
+    Rendering is CPU-bound, so it runs in worker processes. A pool that is
+    already broken is replaced once. If the pool breaks while rendering, or the
+    replacement is broken too, the remaining maps are rendered in this process
+    instead. Each map's metrics are merged into the current request metrics.
+    """
+    names = list(MAP_RENDERERS) if names is None else names
+
+    if RENDER_WORKERS <= 0:
+        for name in names:
+            yield _finish(name, render_map(name, *_render_args(name, ctx, criteria)))
+        return
+
+    pool = get_render_pool()
+    pending = set(names)
+
+    try:
+        try:
+            futures = _submit_renders(pool, names, ctx, criteria)
+        except BrokenProcessPool:
+            # Broken before this request, e.g. by another session; start one fresh pool
+            reset_render_pool(pool)
+            pool = get_render_pool()
+            futures = _submit_renders(pool, names, ctx, criteria)
+
+        for future in as_completed(futures):
+            name = futures[future]
+            result = future.result()
+            pending.discard(name)
+            yield _finish(name, result)
+    except BrokenProcessPool:
+        reset_render_pool(pool)
+        for name in [name for name in names if name in pending]:
+            yield _finish(name, render_map(name, *_render_args(name, ctx, criteria)))
+
+def critical_path(timings: dict) -> float:
+    """Seconds on the longest dependency chain: imports, geocode, slowest fetch, scoring, slowest render."""
+    fetches = [seconds for stage, seconds in timings.items() if stage.startswith('fetch')]
+    renders = [seconds for stage, seconds in timings.items() if stage.startswith('render')]
+    return (timings.get('import pipeline', 0) + timings.get('geocode', 0) + max(fetches, default=0)
+            + timings.get('score layers', 0) + max(renders, default=0))
@@ -0,0 +1,136 @@
+import os
+import threading
+
+import folium
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+
+from . import metrics
+from .files import atomic_write
+from .providers import grid_axes
+from .solar import colorize
+from .tiles import TILE_ROOT, TILE_ZOOM, load_features, tile_bounds, tile_fractions, tile_fractions_to_lonlat
+
+POWER_TAGS = {'power': ['line', 'minor_line', 'cable', 'substation', 'tower']}
+
+# Distances are capped here, which is also how far around a tile its power features are loaded
+GRID_DISTANCE_MAX_KM = 10.0
+
+# Distance rasters are cached per OSM tile; 64 pixels is about 150 m at z12 on the equator
+GRID_DISTANCE_TILE_SIZE = 64
+GRID_DISTANCE_LAYER = f'power_distance_{GRID_DISTANCE_MAX_KM:g}km'
+
+# Lines are densified to about 100 m between vertices so vertex distance stays close to line distance
+GRID_SEGMENT_LENGTH = 0.001  # degrees
+
+GRID_DISTANCE_COLORS = ['darkviolet', 'orange', 'lightyellow']
+_GRID_DISTANCE_RGB = np.array([[148, 0, 211], [255, 165, 0], [255, 255, 224]], dtype=float)
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320  # At the equator
+
+_distance_lock = threading.Lock()
+
+def get_power_data(coords: list):
+    """Power lines, cables, towers and substations for the bounding box, served from the local OSM tile store."""
+    return load_features('power', POWER_TAGS, coords)
+
+def distance_tile_path(x: int, y: int, zoom: int = TILE_ZOOM) -> str:
+    return os.path.join(TILE_ROOT, GRID_DISTANCE_LAYER, str(zoom), str(x), f'{y}.npy')
+
+def _to_km(lons, lats, lat0: float) -> np.ndarray:
+    # Equirectangular projection around lat0, accurate to about 1% within a site
+    return np.column_stack([
+        np.ravel(lons) * KM_PER_DEGREE_LON * np.cos(np.radians(lat0)),
+        np.ravel(lats) * KM_PER_DEGREE_LAT,
+    ])
+
+def _compute_distance_tiles(tiles: list, zoom: int):
+    """Distance from every pixel of the tiles to the nearest power feature, with one KD-tree for all of them."""
+    bounds = np.array([tile_bounds(x, y, zoom) for x, y in tiles])
+    min_lat, max_lat = bounds[:, 0].min(), bounds[:, 1].max()
+    min_lon, max_lon = bounds[:, 2].min(), bounds[:, 3].max()
+
+    # Load everything that can be within the cap of any pixel
+    margin_lat = GRID_DISTANCE_MAX_KM / KM_PER_DEGREE_LAT
+    poleward_lat = min(max(abs(min_lat), abs(max_lat)) + margin_lat, 85.0)
+    margin_lon = GRID_DISTANCE_MAX_KM / (KM_PER_DEGREE_LON * np.cos(np.radians(poleward_lat)))
+    features = get_power_data([
+        min_lat - margin_lat, max_lat + margin_lat, min_lon - margin_lon, max_lon + margin_lon,
+    ])
+
+    lat0 = (min_lat + max_lat) / 2
+    vertices = shapely.get_coordinates(shapely.segmentize(features.geometry.to_numpy(), GRID_SEGMENT_LENGTH))
+    tree = cKDTree(_to_km(vertices[:, 0], vertices[:, 1], lat0)) if len(vertices) else None
+
+    size = GRID_DISTANCE_TILE_SIZE
+    offsets = (np.arange(size) + 0.5) / size
+    for x, y in tiles:
+        # Pixel centres, row 0 at the northern edge
+        fy, fx = np.meshgrid(y + offsets, x + offsets, indexing='ij')
+        lons, lats = tile_fractions_to_lonlat(fx, fy, zoom)
+
+        if tree is None:
+            distances = np.full(size * size, GRID_DISTANCE_MAX_KM)
+        else:
+            distances, _ = tree.query(_to_km(lons, lats, lat0), distance_upper_bound=GRID_DISTANCE_MAX_KM)
+        raster = np.minimum(distances, GRID_DISTANCE_MAX_KM).reshape(size, size).astype(np.float32)
+        with atomic_write(distance_tile_path(x, y, zoom)) as f:
+            np.save(f, raster)
+
+def grid_distance(lats, lons, zoom: int = TILE_ZOOM) -> np.ndarray:
+    """Distance in km from each point to the nearest power infrastructure, capped at GRID_DISTANCE_MAX_KM.
+
+    Reads the per-tile distance rasters, computing the missing ones first.
+    """
+    fx, fy = tile_fractions(lons, lats, zoom)
+    tile_x, tile_y = fx.astype(np.int64), fy.astype(np.int64)
+    size = GRID_DISTANCE_TILE_SIZE
+    pixel_col = np.minimum(((fx - tile_x) * size).astype(np.int64), size - 1)
+    pixel_row = np.minimum(((fy - tile_y) * size).astype(np.int64), size - 1)
+
+    tiles = sorted(set(zip(tile_x.ravel().tolist(), tile_y.ravel().tolist())))
+    missing = [tile for tile in tiles if not os.path.exists(distance_tile_path(*tile, zoom))]
+    metrics.count('grid distance tile hit', len(tiles) - len(missing))
+    metrics.count('grid distance tile miss', len(missing))
+    if missing:
+        with _distance_lock:
+            # Another session may have computed these while we waited
+            missing = [tile for tile in missing if not os.path.exists(distance_tile_path(*tile, zoom))]
+            if missing:
+                with metrics.span('grid distance rasters'):
+                    _compute_distance_tiles(missing, zoom)
+
+    distances = np.empty(fx.shape)
+    for x, y in tiles:
+        in_tile = (tile_x == x) & (tile_y == y)
+        raster = np.load(distance_tile_path(x, y, zoom))
+        distances[in_tile] = raster[pixel_row[in_tile], pixel_col[in_tile]]
+    return distances
+
+def get_grid_distance_data(coords: list, shape: tuple):
+    """Distance to the power grid (km) on a grid over the bounding box."""
+    lats, lons = grid_axes(coords, shape)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    return lats, lons, grid_distance(lat_grid, lon_grid)
+
+def add_grid_distance_layer(m, ctx):
+    """Add the distance-to-grid raster as an overlay that starts hidden, and its color scale."""
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    layer = folium.FeatureGroup(name=f'Distance to power grid (0-{GRID_DISTANCE_MAX_KM:g} km)', show=False)
+
+    # Grid rows run south to north, images north to south
+    folium.raster_layers.ImageOverlay(
+        image=colorize(np.flipud(ctx.grid_distances), 0, GRID_DISTANCE_MAX_KM, palette=_GRID_DISTANCE_RGB),
+        bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+        pixelated=False,
+    ).add_to(layer)
+    layer.add_to(m)
+
+    folium.LinearColormap(
+        colors=GRID_DISTANCE_COLORS,
+        vmin=0,
+        vmax=GRID_DISTANCE_MAX_KM,
+        caption='Distance to power grid (km)',
+    ).add_to(m)
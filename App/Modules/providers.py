@@ -0,0 +1,147 @@
+import json
+import os
+
+import numpy as np
+
+# Point SUSTAINASITE_RASTER_DIR at a chunked raster dataset to serve real data
+RASTER_DIR_ENV = 'SUSTAINASITE_RASTER_DIR'
+
+RADIATION = 'radiation'            # kWh/m^2/year
+WIND_SPEED = 'wind_speed'          # m/s
+WIND_DIRECTION = 'wind_direction'  # degrees, 0 is North
+
+def grid_axes(coords: list, shape: tuple) -> tuple:
+    """Latitudes and longitudes of a rows x cols grid spanning the bounding box."""
+    min_lat, max_lat, min_lon, max_lon = coords
+    rows, cols = shape
+    return np.linspace(min_lat, max_lat, rows), np.linspace(min_lon, max_lon, cols)
+
+class ResourceProvider:
+    """Serves solar radiation and wind on a regular grid over a bounding box.
+
+    Every method returns arrays of shape (len(lats), len(lons)), where
+    [i, j] is the value at (lats[i], lons[j]).
+    """
+
+    name = 'base'
+
+    def sample(self, variable: str, lats, lons) -> np.ndarray:
+        raise NotImplementedError
+
+    def radiation(self, coords: list, shape: tuple) -> tuple:
+        lats, lons = grid_axes(coords, shape)
+        return lats, lons, self.sample(RADIATION, lats, lons)
+
+    def wind(self, coords: list, shape: tuple) -> tuple:
+        lats, lons = grid_axes(coords, shape)
+        return lats, lons, self.sample(WIND_SPEED, lats, lons), self.sample(WIND_DIRECTION, lats, lons)
+
+class SyntheticProvider(ResourceProvider):
+    """Smooth, deterministic fields computed from absolute coordinates.
+
+    The same point always gets the same value, whatever bounding box or
+    resolution it was requested at.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed: int = 42):
+        self.seed = seed
+        self.phases = np.random.default_rng(seed).uniform(0, 2 * np.pi, 6)
+
+    def sample(self, variable: str, lats, lons) -> np.ndarray:
+        lat, lon = np.meshgrid(np.radians(lats), np.radians(lons), indexing='ij')
+        p = self.phases
+
+        if variable == RADIATION:
+            values = (1500
+                      + 450 * np.sin(40 * lat + p[0]) * np.cos(34 * lon + p[1])
+                      + 200 * np.sin(130 * lat + 97 * lon + p[2]))
+            return np.clip(values, 800, 2200)
+        if variable == WIND_SPEED:
+            values = (10
+                      + 6 * np.sin(63 * lat + p[3]) * np.cos(55 * lon + p[4])
+                      + 3 * np.sin(180 * lat - 155 * lon + p[5]))
+            return np.clip(values, 0, 20)
+        if variable == WIND_DIRECTION:
+            return np.mod(180 + 170 * np.sin(29 * lat + 17 * lon + p[0] - p[3]), 360)
+        raise KeyError(variable)
+
+class RasterProvider(ResourceProvider):
+    """Reads chunked rasters from disk, memory-mapping only the chunks a grid touches.
+
+    Each variable is a directory holding meta.json and one .npy file per chunk,
+    named <chunk_row>_<chunk_col>.npy. Row 0 is the southern edge. See
+    write_raster for the layout.
+    """
+
+    name = 'raster'
+
+    def __init__(self, root: str):
+        self.root = root
+        self._meta = {}
+
+    def meta(self, variable: str) -> dict:
+        if variable not in self._meta:
+            with open(os.path.join(self.root, variable, 'meta.json'), 'r', encoding='utf-8') as f:
+                self._meta[variable] = json.load(f)
+        return self._meta[variable]
+
+    def sample(self, variable: str, lats, lons) -> np.ndarray:
+        meta = self.meta(variable)
+        chunk = meta['chunk_size']
+
+        # Nearest raster cell for every grid row and column, -1 outside the raster
+        rows = np.floor((np.asarray(lats) - meta['origin_lat']) / meta['resolution']).astype(np.int64)
+        cols = np.floor((np.asarray(lons) - meta['origin_lon']) / meta['resolution']).astype(np.int64)
+        rows[(rows < 0) | (rows >= meta['rows'])] = -1
+        cols[(cols < 0) | (cols >= meta['cols'])] = -1
+
+        values = np.full((len(rows), len(cols)), np.nan, dtype=float)
+        for chunk_row in np.unique(rows[rows >= 0] // chunk):
+            out_i = np.flatnonzero((rows >= 0) & (rows // chunk == chunk_row))
+            for chunk_col in np.unique(cols[cols >= 0] // chunk):
+                out_j = np.flatnonzero((cols >= 0) & (cols // chunk == chunk_col))
+                path = os.path.join(self.root, variable, f'{chunk_row}_{chunk_col}.npy')
+                if not os.path.exists(path):
+                    continue
+                block = np.load(path, mmap_mode='r')
+                values[np.ix_(out_i, out_j)] = block[np.ix_(rows[out_i] % chunk, cols[out_j] % chunk)]
+        return values
+
+def write_raster(root: str, variable: str, values, origin_lat: float, origin_lon: float,
+                 resolution: float, chunk_size: int = 256):
+    """Split a full raster (row 0 at origin_lat) into chunk files readable by RasterProvider."""
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float32)
+    directory = os.path.join(root, variable)
+    os.makedirs(directory, exist_ok=True)
+
+    for i in range(0, values.shape[0], chunk_size):
+        for j in range(0, values.shape[1], chunk_size):
+            block = np.full((chunk_size, chunk_size), np.nan, dtype=values.dtype)
+            part = values[i:i + chunk_size, j:j + chunk_size]
+            block[:part.shape[0], :part.shape[1]] = part
+            np.save(os.path.join(directory, f'{i // chunk_size}_{j // chunk_size}.npy'), block)
+
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'origin_lat': origin_lat,
+            'origin_lon': origin_lon,
+            'resolution': resolution,
+            'rows': values.shape[0],
+            'cols': values.shape[1],
+            'chunk_size': chunk_size,
+            'dtype': str(values.dtype),
+        }, f, indent=2)
+
+_providers = {}
+
+def get_provider() -> ResourceProvider:
+    """The configured provider: local rasters if SUSTAINASITE_RASTER_DIR is set, else synthetic."""
+    root = os.environ.get(RASTER_DIR_ENV)
+    key = root or SyntheticProvider.name
+    if key not in _providers:
+        _providers[key] = RasterProvider(root) if root else SyntheticProvider()
+    return _providers[key]
@@ -0,0 +1,98 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import joblib
+
+from .files import atomic_write
+
+# Each trained model lives in models/<version>/, and models/ACTIVE names the one to serve
+MODEL_ROOT = 'models'
+ACTIVE_FILE = os.path.join(MODEL_ROOT, 'ACTIVE')
+CLASSIFIER_FILE = 'classifier.joblib'
+SCALER_FILE = 'scaler.joblib'
+
+# Artifacts written by earlier versions of the app, served until a version is published
+LEGACY_VERSION = 'legacy'
+LEGACY_CLASSIFIER = 'renewable_energy_site_classifier.joblib'
+LEGACY_SCALER = 'feature_scaler.joblib'
+
+_loaded = {'version': None, 'model': None}
+_load_lock = threading.Lock()
+
+def active_version() -> str | None:
+    """The version currently marked active, falling back to the legacy artifacts."""
+    try:
+        with open(ACTIVE_FILE, 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+        if version:
+            return version
+    except FileNotFoundError:
+        pass
+
+    if os.path.exists(LEGACY_CLASSIFIER) and os.path.exists(LEGACY_SCALER):
+        return LEGACY_VERSION
+    return None
+
+def _artifact_paths(version: str) -> tuple:
+    if version == LEGACY_VERSION:
+        return LEGACY_CLASSIFIER, LEGACY_SCALER
+    return os.path.join(MODEL_ROOT, version, CLASSIFIER_FILE), os.path.join(MODEL_ROOT, version, SCALER_FILE)
+
+def publish_model(clf, scaler, metadata: dict | None = None, activate: bool = True) -> str:
+    """Write a new model version and, by default, make it the active one.
+
+    The version directory is assembled under a temporary name and renamed into
+    place, so a running app never sees a half-written model.
+    """
+    timestamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    os.makedirs(MODEL_ROOT, exist_ok=True)
+
+    tmp_dir = os.path.join(MODEL_ROOT, f'.{timestamp}.{uuid.uuid4().hex}.tmp')
+    os.makedirs(tmp_dir)
+    try:
+        joblib.dump(clf, os.path.join(tmp_dir, CLASSIFIER_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        # Publishes within the same second take the next free name: <timestamp>-2, -3, ...
+        for n in itertools.count(1):
+            version = timestamp if n == 1 else f'{timestamp}-{n}'
+            with open(os.path.join(tmp_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump({'version': version, **(metadata or {})}, f, indent=2)
+            try:
+                os.rename(tmp_dir, os.path.join(MODEL_ROOT, version))
+                break
+            except OSError:
+                if not os.path.isdir(os.path.join(MODEL_ROOT, version)):
+                    raise
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if activate:
+        with atomic_write(ACTIVE_FILE, 'w') as f:
+            f.write(version)
+    return version
+
+def load_active_model() -> tuple | None:
+    """Return (version, classifier, scaler) for the active model, or None if there is none.
+
+    The model is loaded once per process with memory-mapped arrays and only
+    reloaded when the active version changes.
+    """
+    version = active_version()
+    if version is None:
+        return None
+
+    with _load_lock:
+        if _loaded['version'] != version:
+            classifier_path, scaler_path = _artifact_paths(version)
+            clf = joblib.load(classifier_path, mmap_mode='r')
+            scaler = joblib.load(scaler_path, mmap_mode='r')
+            _loaded['version'], _loaded['model'] = version, (clf, scaler)
+
+        clf, scaler = _loaded['model']
+        return version, clf, scaler
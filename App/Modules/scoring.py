@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+
+import geopandas as gpd
+import numpy as np
+
+from . import metrics
+from .landuse import POLYGON_TYPES
+
+# Physical ranges used to put resources on a 0-1 scale, independent of the grid
+RADIATION_RANGE = (800, 2200)  # kWh/m^2/year
+WIND_SPEED_RANGE = (0, 20)     # m/s
+
+# Land use classes that developments should keep a buffer from
+SENSITIVE_ZONES = [
+    'forest', 'water', 'reservoir', 'basin', 'wetland', 'meadow', 'grass',
+    'conservation', 'nature_reserve', 'recreation_ground', 'village_green',
+]
+ENVIRONMENT_BUFFER_KM = 2.0
+
+# Unmapped land is the most available; developable but mapped land is partly occupied
+OPEN_LAND_AVAILABILITY = 1.0
+MAPPED_LAND_AVAILABILITY = 0.5
+
+RESOURCE_WEIGHT = 100
+
+@dataclass(frozen=True)
+class SiteCriteria:
+    """The form's site type and importance sliders (0-100)."""
+    site_type: str = 'Hybrid'
+    capacity: float = 10
+    env_tolerance: int = 0
+    grid_proximity: int = 0
+    land_availability: int = 0
+
+    def weights(self) -> dict:
+        return {
+            'resource': RESOURCE_WEIGHT,
+            'land': self.land_availability,
+            'grid': self.grid_proximity,
+            # Low tolerance means staying well clear of sensitive land matters more
+            'environment': 100 - self.env_tolerance,
+        }
+
+def normalize(values, low: float, high: float) -> np.ndarray:
+    return np.clip((np.asarray(values, dtype=float) - low) / (high - low), 0, 1)
+
+def land_availability_layer(land_uses) -> np.ndarray:
+    return np.where(np.asarray(land_uses) == 'unknown', OPEN_LAND_AVAILABILITY, MAPPED_LAND_AVAILABILITY)
+
+@metrics.traced('environment layer')
+def environment_layer(lats, lons, land_use_gdf, buffer_km: float = ENVIRONMENT_BUFFER_KM) -> np.ndarray:
+    """0 inside sensitive land use, rising linearly to 1 at buffer_km away or more."""
+    lats = np.asarray(lats, dtype=float)
+    layer = np.ones(lats.shape)
+    if land_use_gdf is None or land_use_gdf.empty or 'landuse' not in land_use_gdf.columns or not lats.size:
+        return layer
+
+    sensitive = land_use_gdf[
+        land_use_gdf.geom_type.isin(POLYGON_TYPES) & land_use_gdf['landuse'].isin(SENSITIVE_ZONES)
+    ]
+    if sensitive.empty:
+        return layer
+
+    # Measure in metres in the local UTM zone
+    points = gpd.GeoSeries(gpd.points_from_xy(lons, lats), crs='EPSG:4326')
+    crs = points.estimate_utm_crs()
+    buffer_m = buffer_km * 1000
+    (point_idx, _), distances = sensitive.to_crs(crs).sindex.nearest(
+        points.to_crs(crs), return_distance=True, max_distance=buffer_m
+    )
+
+    distance = np.full(lats.shape, buffer_m)
+    np.minimum.at(distance, point_idx, distances)
+    return distance / buffer_m
+
+def resource_layer(layers: dict, site_type: str) -> np.ndarray:
+    """Resource potential for the site type, blended with the classifier's probability."""
+    if site_type == 'Solar':
+        physical = layers['solar']
+    elif site_type == 'Wind':
+        physical = layers['wind']
+    else:
+        physical = (layers['solar'] + layers['wind']) / 2
+    return (physical + layers['model']) / 2
+
+def suitability(layers: dict, criteria: SiteCriteria) -> np.ndarray:
+    """Weighted mean of the available layers, in [0, 1]. Layers that are None are skipped."""
+    values = dict(layers, resource=resource_layer(layers, criteria.site_type))
+
+    total = np.zeros(len(values['resource']))
+    weight_sum = 0
+    for name, weight in criteria.weights().items():
+        if weight and values.get(name) is not None:
+            total += weight * values[name]
+            weight_sum += weight
+    return total / weight_sum
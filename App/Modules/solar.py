@@ -1,64 +1,124 @@
 import folium
 from folium.plugins import HeatMap
 import numpy as np
-from .coords import geocode
-
-def get_radiation_map(address: str, scale: int = 50):
-    coords = geocode(address, scale)
-    if isinstance(coords, list):
-        min_lat, max_lat, min_lon, max_lon = coords
-        center_lat = (min_lat + max_lat) / 2
-        center_lon = (min_lon + max_lon) / 2
-
-        # Create a map centered on the location
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=12, control_scale=True)
-
-        # Generate sample data for radiation levels
-        # In a real-world scenario, you would fetch this data from a reliable source
-        num_points = 1000
-        lats = np.random.uniform(min_lat, max_lat, num_points)
-        lons = np.random.uniform(min_lon, max_lon, num_points)
-        
-        # Simulate radiation data (replace this with actual data in a real scenario)
-        # Values are in kWh/m^2/year, typical range for solar radiation
-        radiation_levels = np.random.uniform(800, 2200, num_points)
+from .htmlcache import cached_html
+from .providers import get_provider
 
+# 'raster' ships one PNG overlay whose size does not depend on the sample count,
+# 'heatmap' ships every sample as JSON for Leaflet.heat
+RADIATION_RENDER_MODE = 'raster'
+RADIATION_RASTER_MAX = 256  # Largest overlay side in pixels
+
+RADIATION_COLORS = ['blue', 'lime', 'yellow', 'red']
+_RADIATION_RGB = np.array([[0, 0, 255], [0, 255, 0], [255, 255, 0], [255, 0, 0]], dtype=float)
+
+def get_radiation_data(coords: list, shape: tuple):
+    """Solar radiation levels (kWh/m^2/year) on a grid over the bounding box."""
+    return get_provider().radiation(coords, shape)
+
+def bin_to_raster(lats, lons, values, coords: list, shape: tuple) -> np.ndarray:
+    """Mean of the samples falling in each cell of a rows x cols raster, NaN where empty.
+
+    Row 0 is the northern edge, matching image orientation.
+    """
+    min_lat, max_lat, min_lon, max_lon = coords
+    rows, cols = shape
+    lats, lons, values = (np.asarray(a, dtype=float).ravel() for a in (lats, lons, values))
+
+    valid = (np.isfinite(values)
+             & (lats >= min_lat) & (lats <= max_lat)
+             & (lons >= min_lon) & (lons <= max_lon))
+    r = np.minimum(((max_lat - lats[valid]) / (max_lat - min_lat) * rows).astype(np.int64), rows - 1)
+    c = np.minimum(((lons[valid] - min_lon) / (max_lon - min_lon) * cols).astype(np.int64), cols - 1)
+    cells = r * cols + c
+
+    sums = np.bincount(cells, weights=values[valid], minlength=rows * cols)
+    counts = np.bincount(cells, minlength=rows * cols)
+
+    raster = np.full(rows * cols, np.nan)
+    filled = counts > 0
+    raster[filled] = sums[filled] / counts[filled]
+    return raster.reshape(rows, cols)
+
+def colorize(raster: np.ndarray, vmin: float, vmax: float, opacity: float = 0.6,
+             palette: np.ndarray = _RADIATION_RGB) -> np.ndarray:
+    """RGBA image of a raster on a color scale (RADIATION_COLORS by default), transparent where NaN."""
+    span = (vmax - vmin) or 1.0
+    t = np.clip((np.nan_to_num(raster, nan=vmin) - vmin) / span, 0, 1)
+    stops = np.linspace(0, 1, len(palette))
+
+    rgba = np.empty(raster.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.interp(t, stops, palette[:, channel]).astype(np.uint8)
+    rgba[..., 3] = np.where(np.isnan(raster), 0, int(opacity * 255))
+    return rgba
+
+def add_radiation_layer(m, lats, lons, radiation_levels, coords: list, mode: str = RADIATION_RENDER_MODE,
+                        shape: tuple = (RADIATION_RASTER_MAX, RADIATION_RASTER_MAX)):
+    """Add radiation samples to a map as a raster overlay or a heatmap. Returns (vmin, vmax)."""
+    min_lat, max_lat, min_lon, max_lon = coords
+    radiation_levels = np.asarray(radiation_levels, dtype=float).ravel()
+    vmin, vmax = float(np.nanmin(radiation_levels)), float(np.nanmax(radiation_levels))
+
+    if mode == 'raster':
+        raster = bin_to_raster(lats, lons, radiation_levels, coords, shape)
+        folium.raster_layers.ImageOverlay(
+            image=colorize(raster, vmin, vmax),
+            bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+            pixelated=False,
+        ).add_to(m)
+    else:
         # Create data for heatmap
-        heat_data = [[lat, lon, rad] for lat, lon, rad in zip(lats, lons, radiation_levels)]
+        heat_data = np.column_stack([np.ravel(lats), np.ravel(lons), radiation_levels]).tolist()
 
-        # Add heatmap to the map
-        HeatMap(heat_data, 
+        HeatMap(heat_data,
                 min_opacity=0.2,
-                max_val=max(radiation_levels),
-                radius=15, 
-                blur=10, 
+                max_val=vmax,
+                radius=15,
+                blur=10,
                 max_zoom=1,
                 gradient={0.4: 'blue', 0.65: 'lime', 0.8: 'yellow', 1: 'red'},
         ).add_to(m)
 
-        # Add a rectangle to show the bounding box
-        folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]],
-                         fill=False,
-                         color='black',
-                         weight=2).add_to(m)
-
-        # Add a color scale legend
-        colormap = folium.LinearColormap(
-            colors=['blue', 'lime', 'yellow', 'red'],
-            vmin=min(radiation_levels),
-            vmax=max(radiation_levels),
-            caption='Average Annual Solar Radiation (kWh/m^2/year)'
-        )
-        colormap.add_to(m)
-
-        # Save the map to an HTML file
-        map_file = f'tmp/{address}_radiation_map.html'
-        m.save(map_file)
-        return map_file, lats, lons, radiation_levels
-    else:
-        return coords  # This will be "Address not documented" if geocoding failed
+    return vmin, vmax
+
+def build_radiation_map(ctx, mode: str = RADIATION_RENDER_MODE):
+    """Build the solar radiation map for a SiteContext."""
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    center_lat, center_lon = ctx.center
+    lon_grid, lat_grid = np.meshgrid(ctx.lons, ctx.lats)
+
+    # Create a map centered on the location
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=12, control_scale=True)
+
+    # One raster pixel per grid point, capped so the page size stays bounded
+    shape = (min(len(ctx.lats), RADIATION_RASTER_MAX), min(len(ctx.lons), RADIATION_RASTER_MAX))
+    vmin, vmax = add_radiation_layer(m, lat_grid, lon_grid, ctx.radiation_levels, ctx.coords, mode, shape)
+
+    # Add a rectangle to show the bounding box
+    folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+                     fill=False,
+                     color='black',
+                     weight=2).add_to(m)
+
+    # Add a color scale legend
+    colormap = folium.LinearColormap(
+        colors=RADIATION_COLORS,
+        vmin=vmin,
+        vmax=vmax,
+        caption='Average Annual Solar Radiation (kWh/m^2/year)'
+    )
+    colormap.add_to(m)
+
+    return m
+
+def get_radiation_map(ctx) -> str:
+    """Rendered HTML of the solar radiation map."""
+    return cached_html('radiation', ctx, build_radiation_map, RADIATION_RENDER_MODE)
 
 if __name__ == "__main__":
+    from .context import build_site_context
+
     address = "Phoenix, AZ"
-    map_file = get_radiation_map(address, scale=10)
-    print(f"Radiation map saved as: {map_file}")
\ No newline at end of file
+    html = get_radiation_map(build_site_context(address, scale=10))
+    print(f"Radiation map rendered: {len(html)} bytes")
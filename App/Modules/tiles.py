@@ -0,0 +1,210 @@
+import math
+import os
+import threading
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from shapely.geometry import box
+
+from . import metrics
+from .files import atomic_write
+
+# OSM features are cached as z12 slippy map tiles (roughly 10 x 10 km at the equator)
+TILE_ZOOM = 12
+TILE_ROOT = 'tiles'
+
+_fetch_lock = threading.Lock()
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int = TILE_ZOOM) -> tuple:
+    """Slippy map tile (x, y) containing a point."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bounds(x: int, y: int, zoom: int = TILE_ZOOM) -> list:
+    """Bounding box of a tile as [min_lat, max_lat, min_lon, max_lon]."""
+    n = 2 ** zoom
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+    return [lat(y + 1), lat(y), x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0]
+
+def tile_fractions(lons, lats, zoom: int = TILE_ZOOM) -> tuple:
+    """Fractional tile (x, y) of many points; the integer part is the tile, the rest the position in it."""
+    n = 2 ** zoom
+    lats = np.clip(np.asarray(lats, dtype=float), -85.0511, 85.0511)
+    fx = (np.asarray(lons, dtype=float) + 180.0) / 360.0 * n
+    fy = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0 * n
+    # Keep the far edges inside the last tile
+    return np.clip(fx, 0, np.nextafter(n, 0)), np.clip(fy, 0, np.nextafter(n, 0))
+
+def tile_fractions_to_lonlat(fx, fy, zoom: int = TILE_ZOOM) -> tuple:
+    """Inverse of tile_fractions, returning (lons, lats)."""
+    n = 2 ** zoom
+    lons = np.asarray(fx, dtype=float) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(fy, dtype=float) / n))))
+    return lons, lats
+
+def tiles_for_bbox(coords: list, zoom: int = TILE_ZOOM) -> list:
+    """Every tile intersecting a [min_lat, max_lat, min_lon, max_lon] bounding box."""
+    min_lat, max_lat, min_lon, max_lon = coords
+    min_x, min_y = lonlat_to_tile(min_lon, max_lat, zoom)
+    max_x, max_y = lonlat_to_tile(max_lon, min_lat, zoom)
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+def tile_path(layer: str, x: int, y: int, zoom: int = TILE_ZOOM) -> str:
+    return os.path.join(TILE_ROOT, layer, str(zoom), str(x), f'{y}.parquet')
+
+def fetch_from_overpass(coords: list, tags: dict):
+    """Fetch OSM features for a bounding box through the osmnx response cache."""
+    # osmnx is slow to import and only needed when a tile is missing
+    import osmnx as ox
+    from osmnx._errors import InsufficientResponseError
+
+    min_lat, max_lat, min_lon, max_lon = coords
+    try:
+        return ox.geometries_from_bbox(max_lat, min_lat, max_lon, min_lon, tags=tags)
+    except InsufficientResponseError:
+        return None
+
+def _prepare_features(gdf, tags: dict):
+    """Reduce an osmnx result to its id, the requested tag columns and valid geometry."""
+    columns = list(tags)
+    if gdf is None or gdf.empty:
+        return gpd.GeoDataFrame(
+            {'element_type': [], 'osmid': [], **{column: [] for column in columns}},
+            geometry=gpd.GeoSeries([], crs='EPSG:4326'),
+        )
+
+    gdf = gdf.reset_index()
+    for column in columns:
+        if column not in gdf.columns:
+            gdf[column] = None
+    gdf = gdf[['element_type', 'osmid', *columns, 'geometry']].copy()
+    gdf['osmid'] = gdf['osmid'].astype('int64')
+    gdf[columns] = gdf[columns].astype(object).where(gdf[columns].notna(), None)
+    gdf['geometry'] = gdf.geometry.make_valid()
+    return gdf.set_crs('EPSG:4326', allow_override=True)
+
+def tile_groups(tiles: list) -> list:
+    """Split tiles into rectangles of adjacent tiles, each fetched with one bounding box.
+
+    Runs of adjacent tiles in a row are merged with identical runs in the rows
+    below, so a ring of missing tiles around cached ones becomes four strips
+    rather than one box over the whole area.
+    """
+    runs = []  # (first x, last x, y), row by row
+    for y in sorted({y for _, y in tiles}):
+        xs = sorted({x for x, row in tiles if row == y})
+        start = xs[0]
+        for prev, x in zip(xs, xs[1:] + [None]):
+            if x != prev + 1:
+                runs.append((start, prev, y))
+                start = x
+
+    growing = {}  # (first x, last x) -> [first x, last x, first y, last y]
+    rects = []
+    for x0, x1, y in runs:
+        rect = growing.get((x0, x1))
+        if rect is not None and rect[3] == y - 1:
+            rect[3] = y
+        else:
+            rect = growing[(x0, x1)] = [x0, x1, y, y]
+            rects.append(rect)
+    return [[(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)] for x0, x1, y0, y1 in rects]
+
+def _fetch_tiles(layer: str, tags: dict, tiles: list, fetch, zoom: int):
+    """Fetch the bounding box covering a rectangle of missing tiles once and split it into tiles."""
+    bounds = [tile_bounds(x, y, zoom) for x, y in tiles]
+    coords = [
+        min(b[0] for b in bounds), max(b[1] for b in bounds),
+        min(b[2] for b in bounds), max(b[3] for b in bounds),
+    ]
+    with metrics.span(f'overpass {layer}'):
+        features = _prepare_features(fetch(coords, tags), tags)
+
+    tile_boxes = gpd.GeoSeries([box(b[2], b[0], b[3], b[1]) for b in bounds], crs='EPSG:4326')
+    if features.empty:
+        feature_idx, tile_idx = [], []
+    else:
+        feature_idx, tile_idx = tile_boxes.sindex.query(features.geometry, predicate='intersects')
+    members = pd.Series(feature_idx).groupby(pd.Series(tile_idx, dtype='int64'))
+
+    for i, (x, y) in enumerate(tiles):
+        rows = members.get_group(i).to_numpy() if i in members.groups else []
+        with atomic_write(tile_path(layer, x, y, zoom)) as f:
+            features.iloc[rows].to_parquet(f, index=False)
+
+def _read_tiles(layer: str, tags: dict, tiles: list, fetch, zoom: int):
+    """Whole features stored in the tiles, fetching missing tiles first, deduplicated."""
+    missing = [tile for tile in tiles if not os.path.exists(tile_path(layer, *tile, zoom))]
+    metrics.count(f'{layer} tile hit', len(tiles) - len(missing))
+    metrics.count(f'{layer} tile miss', len(missing))
+
+    if missing:
+        with _fetch_lock:
+            # Another session may have fetched these while we waited
+            missing = [tile for tile in missing if not os.path.exists(tile_path(layer, *tile, zoom))]
+            for group in tile_groups(missing):
+                _fetch_tiles(layer, tags, group, fetch, zoom)
+
+    # Read the raw tables and decode WKB once; gpd.read_parquet re-parses the CRS for every tile
+    with metrics.span(f'read {layer} tiles'):
+        tables = [pq.read_table(tile_path(layer, x, y, zoom)) for x, y in tiles]
+    tables = [table for table in tables if table.num_rows]
+    if not tables:
+        return _prepare_features(None, tags).set_index(['element_type', 'osmid'])
+
+    df = pa.concat_tables(tables, promote_options='default').to_pandas()
+    df = df.drop_duplicates(subset=['element_type', 'osmid'])
+    gdf = gpd.GeoDataFrame(df, geometry=shapely.from_wkb(df['geometry'].to_numpy()), crs='EPSG:4326')
+    return gdf.set_index(['element_type', 'osmid'])
+
+def _clip(gdf, coords: list):
+    if gdf.empty:
+        return gdf
+    min_lat, max_lat, min_lon, max_lon = coords
+    gdf = gdf.clip(box(min_lon, min_lat, max_lon, max_lat), keep_geom_type=False).sort_index()
+    # Clipping a clipped feature can start and orient its rings differently; normalized and
+    # sorted, the same area gives the same frame, and fingerprint, whichever way it was loaded
+    gdf['geometry'] = shapely.normalize(gdf.geometry.to_numpy())
+    return gdf
+
+def load_features(layer: str, tags: dict, coords: list, fetch=fetch_from_overpass, zoom: int = TILE_ZOOM):
+    """OSM features for a bounding box, read from local tiles and fetching only missing ones.
+
+    Features are stored whole in every tile they touch, deduplicated on load and
+    clipped to the bounding box.
+    """
+    return _clip(_read_tiles(layer, tags, tiles_for_bbox(coords, zoom), fetch, zoom), coords)
+
+def extend_features(layer: str, tags: dict, coords: list, previous, previous_coords: list,
+                    fetch=fetch_from_overpass, zoom: int = TILE_ZOOM):
+    """load_features for coords, reusing features already loaded for previous_coords.
+
+    Only tiles not wholly inside previous_coords are read, or fetched if missing.
+    Features touching those tiles come whole from the tiles. Every other feature
+    lies inside previous_coords, so its copy clipped to previous_coords is exact.
+    """
+    prev_min_lat, prev_max_lat, prev_min_lon, prev_max_lon = previous_coords
+    tiles = tiles_for_bbox(coords, zoom)
+    margin = []
+    for x, y in tiles:
+        min_lat, max_lat, min_lon, max_lon = tile_bounds(x, y, zoom)
+        if not (prev_min_lat <= min_lat and max_lat <= prev_max_lat
+                and prev_min_lon <= min_lon and max_lon <= prev_max_lon):
+            margin.append((x, y))
+    metrics.count(f'{layer} tile reused', len(tiles) - len(margin))
+
+    features = _read_tiles(layer, tags, margin, fetch, zoom)
+    reused = previous[~previous.index.isin(features.index)]
+    if features.empty:
+        return _clip(reused, coords)
+    return _clip(pd.concat([reused, features]), coords)
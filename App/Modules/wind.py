@@ -1,96 +1,185 @@
+import base64
+
 import folium
-from folium.plugins import FloatImage
+from branca.element import MacroElement
+from jinja2 import Template
 import numpy as np
-from .coords import geocode
-import math
-
-def get_wind_map(address: str, scale: int = 50):
-    coords = geocode(address, scale)
-    if isinstance(coords, list):
-        min_lat, max_lat, min_lon, max_lon = coords
-        center_lat = (min_lat + max_lat) / 2
-        center_lon = (min_lon + max_lon) / 2
-
-        # Create a map centered on the location
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=10, control_scale=True)
-
-        # Generate sample data for wind speed and direction
-        # In a real-world scenario, you would fetch this data from a reliable source
-        num_points = 20
-        lats = np.linspace(min_lat, max_lat, num_points)
-        lons = np.linspace(min_lon, max_lon, num_points)
-        
-        # Simulate wind data (replace this with actual data in a real scenario)
-        # Wind speed in m/s, direction in degrees (0-360, where 0 is North)
-        wind_speeds = np.random.uniform(0, 20, (num_points, num_points))
-        wind_directions = np.random.uniform(0, 360, (num_points, num_points))
-
-        # Function to create arrow symbol
-        def create_arrow(direction, speed, color):
-            return f'''
-                <svg width="50" height="50">
-                    <defs>
-                        <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="0" refY="3.5" orient="auto">
-                            <polygon points="0 0, 10 3.5, 0 7" fill="{color}" />
-                        </marker>
-                    </defs>
-                    <line x1="25" y1="25" x2="{25 + 20 * math.sin(math.radians(direction))}" 
-                          y2="{25 - 20 * math.cos(math.radians(direction))}" 
-                          stroke="{color}" stroke-width="{1 + speed/5}" 
-                          marker-end="url(#arrowhead)" />
-                </svg>
-            '''
-
-        # Blue color scale for wind speed
-        def get_color(speed):
-            if speed < 5:
-                return '#E6F3FF'  # Very light blue
-            elif speed < 10:
-                return '#99CCFF'  # Light blue
-            elif speed < 15:
-                return '#3399FF'  # Medium blue
-            else:
-                return '#0066CC'  # Dark blue
-
-        # Add wind arrows to the map
-        for i, lat in enumerate(lats):
-            for j, lon in enumerate(lons):
-                speed = wind_speeds[i, j]
-                direction = wind_directions[i, j]
-                color = get_color(speed)
-                arrow_html = create_arrow(direction, speed, color)
-                folium.Marker(
-                    [lat, lon],
-                    icon=folium.DivIcon(html=arrow_html)
-                ).add_to(m)
-
-        # Add a rectangle to show the bounding box
-        folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]],
-                         fill=False,
-                         color='black',
-                         weight=2).add_to(m)
-
-        # Add a legend
-        legend_html = '''
-        <div style="position: fixed; bottom: 50px; left: 50px; width: 150px; 
-        border:2px solid grey; z-index:9999; font-size:14px; background-color:white;">
-            <p style="margin: 5px;">Wind Speed (m/s)</p>
-            <p style="margin: 5px;"><span style="color: #E6F3FF;">■</span> 0-5</p>
-            <p style="margin: 5px;"><span style="color: #99CCFF;">■</span> 5-10</p>
-            <p style="margin: 5px;"><span style="color: #3399FF;">■</span> 10-15</p>
-            <p style="margin: 5px;"><span style="color: #0066CC;">■</span> 15+</p>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
-
-        # Save the map to an HTML file
-        map_file = f'tmp/{address}_wind_map.html'
-        m.save(map_file)
-        return map_file, lats, lons, wind_speeds, wind_directions
-    else:
-        return coords  # This will be "Address not documented" if geocoding failed
+from .htmlcache import cached_html
+from .providers import get_provider
+
+# Blue color scale for wind speed, upper bounds in m/s
+SPEED_THRESHOLDS = [5, 10, 15]
+SPEED_COLORS = ['#E6F3FF', '#99CCFF', '#3399FF', '#0066CC']
+
+# Speed byte for cells without wind data, e.g. outside a raster's coverage; no arrow is drawn
+NO_DATA = 255
+
+class WindFieldLayer(MacroElement):
+    """Wind arrows drawn on a single canvas from a quantized base64 payload.
+
+    Speed and direction are packed as one byte per cell, so the page grows by
+    about 2.7 bytes per cell rather than one SVG marker per cell. Speeds use
+    0-254 and NO_DATA marks cells without a speed or direction.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        if (!L.WindFieldCanvas) {
+            L.WindFieldCanvas = L.Layer.extend({
+                initialize: function (options) {
+                    var decode = function (data) {
+                        var raw = atob(data), bytes = new Uint8Array(raw.length);
+                        for (var i = 0; i < raw.length; i++) { bytes[i] = raw.charCodeAt(i); }
+                        return bytes;
+                    };
+                    this.options = options;
+                    this._speeds = decode(options.speeds);
+                    this._directions = decode(options.directions);
+                },
+                onAdd: function (map) {
+                    this._map = map;
+                    this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+                    this._canvas.style.pointerEvents = 'none';
+                    map.getPanes().overlayPane.appendChild(this._canvas);
+                    map.on('moveend zoomend resize', this._redraw, this);
+                    this._redraw();
+                },
+                onRemove: function (map) {
+                    L.DomUtil.remove(this._canvas);
+                    map.off('moveend zoomend resize', this._redraw, this);
+                },
+                _color: function (speed) {
+                    var o = this.options;
+                    for (var i = 0; i < o.thresholds.length; i++) {
+                        if (speed < o.thresholds[i]) { return o.colors[i]; }
+                    }
+                    return o.colors[o.colors.length - 1];
+                },
+                _redraw: function () {
+                    var map = this._map, o = this.options, size = map.getSize();
+                    var canvas = this._canvas, ctx = canvas.getContext('2d');
+                    canvas.width = size.x;
+                    canvas.height = size.y;
+                    L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+                    ctx.clearRect(0, 0, size.x, size.y);
+
+                    var rowStep = (o.bounds[1] - o.bounds[0]) / Math.max(o.rows - 1, 1);
+                    var colStep = (o.bounds[3] - o.bounds[2]) / Math.max(o.cols - 1, 1);
+
+                    // Skip cells so that arrows stay at least o.spacing pixels apart
+                    var low = map.latLngToContainerPoint([o.bounds[0], o.bounds[2]]);
+                    var high = map.latLngToContainerPoint([o.bounds[1], o.bounds[3]]);
+                    var cell = Math.min(
+                        Math.abs(high.x - low.x) / Math.max(o.cols - 1, 1),
+                        Math.abs(high.y - low.y) / Math.max(o.rows - 1, 1)
+                    );
+                    var stride = Math.max(1, Math.ceil(o.spacing / Math.max(cell, 1e-6)));
+
+                    for (var i = 0; i < o.rows; i += stride) {
+                        for (var j = 0; j < o.cols; j += stride) {
+                            var p = map.latLngToContainerPoint([o.bounds[0] + i * rowStep, o.bounds[2] + j * colStep]);
+                            if (p.x < -o.length || p.y < -o.length || p.x > size.x + o.length || p.y > size.y + o.length) { continue; }
+
+                            var k = i * o.cols + j;
+                            if (this._speeds[k] === o.noData) { continue; }
+                            var speed = this._speeds[k] / (o.noData - 1) * o.maxSpeed;
+                            var angle = this._directions[k] / 256 * 2 * Math.PI;
+                            var dx = Math.sin(angle), dy = -Math.cos(angle);
+                            var x = p.x + o.length * dx, y = p.y + o.length * dy;
+
+                            ctx.strokeStyle = ctx.fillStyle = this._color(speed);
+                            ctx.lineWidth = 1 + speed / 5;
+                            ctx.beginPath();
+                            ctx.moveTo(p.x, p.y);
+                            ctx.lineTo(x, y);
+                            ctx.stroke();
+
+                            ctx.beginPath();
+                            ctx.moveTo(x + 6 * dx, y + 6 * dy);
+                            ctx.lineTo(x - 3 * dy, y + 3 * dx);
+                            ctx.lineTo(x + 3 * dy, y - 3 * dx);
+                            ctx.fill();
+                        }
+                    }
+                }
+            });
+        }
+        var {{ this.get_name() }} = new L.WindFieldCanvas({{ this.options|tojson }}).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, lats, lons, wind_speeds, wind_directions, spacing: int = 30, length: int = 20):
+        super().__init__()
+        self._name = 'WindFieldLayer'
+
+        wind_speeds = np.asarray(wind_speeds, dtype=float)
+        wind_directions = np.asarray(wind_directions, dtype=float)
+        valid = np.isfinite(wind_speeds) & np.isfinite(wind_directions)
+        max_speed = float(wind_speeds[valid].max()) if valid.any() else 0.0
+
+        speeds = np.zeros(wind_speeds.shape, dtype=np.uint8)
+        if max_speed > 0:
+            speeds[valid] = np.rint(wind_speeds[valid] / max_speed * (NO_DATA - 1))
+        speeds[~valid] = NO_DATA
+        directions = np.zeros(wind_directions.shape, dtype=np.uint8)
+        directions[valid] = (np.mod(wind_directions[valid], 360) / 360 * 256).astype(np.uint16).clip(0, 255)
+
+        self.options = {
+            'bounds': [float(lats[0]), float(lats[-1]), float(lons[0]), float(lons[-1])],
+            'rows': len(lats),
+            'cols': len(lons),
+            'maxSpeed': max_speed,
+            'noData': NO_DATA,
+            'speeds': base64.b64encode(speeds.tobytes()).decode('ascii'),
+            'directions': base64.b64encode(directions.tobytes()).decode('ascii'),
+            'thresholds': SPEED_THRESHOLDS,
+            'colors': SPEED_COLORS,
+            'spacing': spacing,
+            'length': length,
+        }
+
+def get_wind_data(coords: list, shape: tuple):
+    """Wind speed (m/s) and direction (degrees, 0 is North) on a grid over the bounding box."""
+    return get_provider().wind(coords, shape)
+
+def build_wind_map(ctx):
+    """Build the wind speed and direction map for a SiteContext."""
+    min_lat, max_lat, min_lon, max_lon = ctx.coords
+    center_lat, center_lon = ctx.center
+
+    # Create a map centered on the location
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=10, control_scale=True)
+
+    # Add wind arrows to the map
+    WindFieldLayer(ctx.lats, ctx.lons, ctx.wind_speeds, ctx.wind_directions).add_to(m)
+
+    # Add a rectangle to show the bounding box
+    folium.Rectangle(bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+                     fill=False,
+                     color='black',
+                     weight=2).add_to(m)
+
+    # Add a legend
+    legend_html = '''
+    <div style="position: fixed; bottom: 50px; left: 50px; width: 150px; 
+    border:2px solid grey; z-index:9999; font-size:14px; background-color:white;">
+        <p style="margin: 5px;">Wind Speed (m/s)</p>
+        <p style="margin: 5px;"><span style="color: #E6F3FF;">■</span> 0-5</p>
+        <p style="margin: 5px;"><span style="color: #99CCFF;">■</span> 5-10</p>
+        <p style="margin: 5px;"><span style="color: #3399FF;">■</span> 10-15</p>
+        <p style="margin: 5px;"><span style="color: #0066CC;">■</span> 15+</p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    return m
+
+def get_wind_map(ctx) -> str:
+    """Rendered HTML of the wind map."""
+    return cached_html('wind', ctx, build_wind_map)
 
 if __name__ == "__main__":
+    from .context import build_site_context
+
     address = "Chicago, IL"
-    map_file = get_wind_map(address, scale=10)
-    print(f"Wind map saved as: {map_file}")
\ No newline at end of file
+    html = get_wind_map(build_site_context(address, scale=10))
+    print(f"Wind map rendered: {len(html)} bytes")
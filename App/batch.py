@@ -0,0 +1,44 @@
+"""Screen many candidate sites in one run.
+
+Run from the repository root:
+
+    python App/batch.py sites.csv --out results.csv --parquet results.parquet
+
+sites.csv needs an address column (optionally scale, in km) or min_lat,
+max_lat, min_lon, max_lon columns, plus an optional name column. Result rows
+are appended to --out as each site completes.
+"""
+import argparse
+import csv
+
+import pandas as pd
+
+from Modules.batch import BATCH_WORKERS, RESULT_COLUMNS, read_sites, run_batch
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen many renewable energy sites in parallel.")
+    parser.add_argument('sites', help="CSV of addresses or bounding boxes")
+    parser.add_argument('--out', default='batch_results.csv', help="CSV written as results arrive")
+    parser.add_argument('--parquet', help="Also write all results to this Parquet file at the end")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help="Worker processes")
+    args = parser.parse_args()
+
+    sites = read_sites(args.sites)
+    rows = []
+
+    with open(args.out, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+
+        for row in run_batch(sites, workers=args.workers):
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            status = row['error'] or f"{row['suitable_cells']} suitable cells, best score {row['best_score']}"
+            print(f"[{len(rows)}/{len(sites)}] {row['name']}: {status}")
+
+    if args.parquet:
+        pd.DataFrame(rows, columns=RESULT_COLUMNS).to_parquet(args.parquet, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the per-point land use loop against the bulk spatial join.
+
+Run from the App directory:
+
+    python -m benchmarks.landuse_join
+
+The loop is O(points x polygons), so above --loop-limit points it is timed on a
+sample and extrapolated linearly. Exits non-zero if the two disagree on any point
+the loop evaluated, other than where overlapping polygons let a restricted zone win.
+"""
+import argparse
+import time
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point, box
+
+from Modules.final_map import RESTRICTED_ZONES, get_land_use_labels
+
+LAND_USES = ['residential', 'commercial', 'industrial', 'agricultural', 'forest', 'grass', 'water']
+
+# Roughly the 50 km box around Mumbai
+BBOX = (18.6, 19.5, 72.4, 73.3)
+
+def make_land_use_gdf(num_polygons: int, seed: int = 42, bbox: tuple = BBOX):
+    """Random, partly overlapping land use polygons inside a bounding box."""
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = bbox
+    lats = rng.uniform(min_lat, max_lat, num_polygons)
+    lons = rng.uniform(min_lon, max_lon, num_polygons)
+    sizes = rng.uniform(0.002, 0.03, num_polygons)
+    geometry = [box(lon, lat, lon + size, lat + size) for lat, lon, size in zip(lats, lons, sizes)]
+    return gpd.GeoDataFrame({'landuse': rng.choice(LAND_USES, num_polygons)}, geometry=geometry, crs='EPSG:4326')
+
+def get_land_use_at_point(gdf, lat, lon):
+    """The per-point reference: the land use of the first polygon containing the point."""
+    point = Point(lon, lat)
+    for idx, row in gdf.iterrows():
+        if row['geometry'].contains(point):
+            return row.get('landuse', 'unknown')
+    return 'unknown'
+
+def make_points(num_points: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    return rng.uniform(min_lat, max_lat, num_points), rng.uniform(min_lon, max_lon, num_points)
+
+def time_loop(gdf, lats, lons, limit):
+    n = min(len(lats), limit)
+    start = time.perf_counter()
+    labels = [get_land_use_at_point(gdf, lat, lon) for lat, lon in zip(lats[:n], lons[:n])]
+    elapsed = time.perf_counter() - start
+    return elapsed * len(lats) / n, n < len(lats), labels
+
+def time_bulk(gdf, lats, lons):
+    start = time.perf_counter()
+    labels = get_land_use_labels(gdf, lats, lons)
+    return time.perf_counter() - start, labels
+
+def count_mismatches(loop_labels, bulk_labels) -> int:
+    """Points where the bulk label differs from the loop's first containing polygon.
+
+    The bulk join may pick a restricted zone over an earlier polygon the point is
+    also in, so that case is not a mismatch.
+    """
+    loop_labels = np.asarray(loop_labels, dtype=object)
+    bulk_labels = np.asarray(bulk_labels[:len(loop_labels)], dtype=object)
+    restricted_won = np.isin(bulk_labels, RESTRICTED_ZONES) & ~np.isin(loop_labels, RESTRICTED_ZONES + ['unknown'])
+    return int(np.sum((loop_labels != bulk_labels) & ~restricted_won))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polygons', type=int, default=3000)
+    parser.add_argument('--points', type=int, nargs='+', default=[400, 10_000, 100_000])
+    parser.add_argument('--loop-limit', type=int, default=400)
+    args = parser.parse_args()
+
+    gdf = make_land_use_gdf(args.polygons)
+    print(f"{args.polygons} polygons")
+    print(f"{'points':>8} {'loop (s)':>12} {'bulk (s)':>10} {'speedup':>9}")
+
+    mismatches = 0
+    for num_points in args.points:
+        lats, lons = make_points(num_points)
+        loop_time, extrapolated, loop_labels = time_loop(gdf, lats, lons, args.loop_limit)
+        bulk_time, bulk_labels = time_bulk(gdf, lats, lons)
+        mismatches += count_mismatches(loop_labels, bulk_labels)
+        marker = '*' if extrapolated else ' '
+        print(f"{num_points:>8} {loop_time:>11.3f}{marker} {bulk_time:>10.4f} {loop_time / bulk_time:>8.0f}x")
+
+    print("* extrapolated from the first", args.loop_limit, "points")
+    if mismatches:
+        raise SystemExit(f"The bulk join disagreed with the loop on {mismatches} points")
+
+if __name__ == "__main__":
+    main()
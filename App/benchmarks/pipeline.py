@@ -0,0 +1,225 @@
+"""Replay recorded fixtures through the whole pipeline and check for regressions.
+
+Run from the App directory:
+
+    python -m benchmarks.pipeline --save baseline.json
+    python -m benchmarks.pipeline --baseline baseline.json
+
+Geocoding is served from benchmarks/fixtures/geocode.json and Overpass from the
+recorded responses in the repository's cache/ directory, so nothing touches
+the network. Solar and wind come from the seeded synthetic provider. Every
+run starts from an empty tile store, HTML cache and model registry in a
+temporary directory.
+
+For each scale and grid size, every stage is timed (best of --repeat), then
+run once more under tracemalloc for its peak memory. With --baseline, the run
+fails if any stage is more than --threshold slower, hungrier or larger than
+the baseline.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import osmnx as ox
+from osmnx._errors import InsufficientResponseError
+from shapely.geometry import box
+
+from Modules import coords, htmlcache, tiles
+from Modules.context import build_site_context
+from Modules.final_map import (
+    assemble_features, create_ml_renewable_energy_map, feature_matrix, train_site_classifier,
+)
+from Modules.landuse import get_land_use_map
+from Modules.map import get_map
+from Modules.power import POWER_TAGS
+from Modules.registry import publish_model
+from Modules.solar import get_radiation_map
+from Modules.wind import get_wind_map
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+OVERPASS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'cache')
+
+ADDRESS = 'Mumbai'
+TRAINING_SCALE = 25
+
+# Changes smaller than this are noise whatever the ratio
+MIN_SECONDS = 0.05
+MIN_BYTES = 1024 * 1024
+
+MAPS = {
+    'map': get_map,
+    'land_use': get_land_use_map,
+    'radiation': get_radiation_map,
+    'wind': get_wind_map,
+    'ml_renewable_energy': create_ml_renewable_energy_map,
+}
+
+def load_overpass_fixtures(directory: str = OVERPASS_DIR) -> list:
+    """Every recorded Overpass response with at least one element."""
+    responses = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            response = json.load(f)
+        if response.get('elements'):
+            responses.append(response)
+    return responses
+
+def overpass_stand_in(responses: list):
+    """A fetch function for tiles.load_features that answers from recorded responses.
+
+    Uses the same osmnx parser as a live query, so features come out exactly as
+    they would from ox.geometries_from_bbox over the recorded area.
+    """
+    def fetch(bbox: list, tags: dict):
+        min_lat, max_lat, min_lon, max_lon = bbox
+        try:
+            return ox.features._create_gdf(responses, box(min_lon, min_lat, max_lon, max_lat), tags)
+        except InsufficientResponseError:
+            return None
+    return fetch
+
+def seed_geocodes():
+    with open(os.path.join(FIXTURE_DIR, 'geocode.json'), 'r', encoding='utf-8') as f:
+        for address, (latitude, longitude) in json.load(f).items():
+            coords.store_geocode(address, latitude, longitude)
+
+def enter_workdir(root: str, name: str):
+    """Switch to an empty directory under root: no tiles or HTML, the shared model, seeded geocodes."""
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    os.chdir(path)
+    if os.path.isdir(os.path.join(root, 'models')):
+        os.symlink(os.path.join(root, 'models'), 'models')
+    seed_geocodes()
+
+def fetch_stages(bbox: list) -> list:
+    """(stage, layer, tags, area) for every tile layer a site in bbox needs."""
+    # The margin covers the grid-distance cap around the edge tiles
+    margin = 0.2
+    power_bbox = [bbox[0] - margin, bbox[1] + margin, bbox[2] - margin, bbox[3] + margin]
+    return [
+        ('fetch land use tiles', 'landuse', {'landuse': True}, bbox),
+        ('fetch power tiles', 'power', POWER_TAGS, power_bbox),
+    ]
+
+def fetch_cold(layer: str, tags: dict, area: list, fetch):
+    """Fill one layer of the tile store from empty, so every run parses and writes every tile."""
+    shutil.rmtree(os.path.join(tiles.TILE_ROOT, layer), ignore_errors=True)
+    return tiles.load_features(layer, tags, area, fetch=fetch)
+
+def train_model(root: str, fetch):
+    """Train on the fixture site and publish the model under root."""
+    enter_workdir(root, 'training')
+    bbox = coords.geocode(ADDRESS, TRAINING_SCALE)
+    for _, layer, tags, area in fetch_stages(bbox):
+        tiles.load_features(layer, tags, area, fetch=fetch)
+    ctx = build_site_context(ADDRESS, TRAINING_SCALE, coords=bbox)
+    cells, labels = assemble_features(ctx)
+    clf, scaler = train_site_classifier(feature_matrix(cells), labels)
+
+    os.chdir(root)
+    publish_model(clf, scaler, metadata={'benchmark': True})
+
+def measure(fn, *args, repeat: int = 1) -> tuple:
+    """(result, best wall seconds, peak traced bytes) of fn(*args)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+def render_fresh(render, ctx) -> str:
+    # Score layers are kept on the context between requests; time them every run
+    ctx.layers.clear()
+    return render(ctx)
+
+def run_case(scale: int, grid_size: int, fetch, repeat: int) -> dict:
+    """Stage -> {seconds, peak_bytes, output_bytes} for one scale and grid size, from a cold tile store."""
+    results = {}
+    for stage, layer, tags, area in fetch_stages(coords.geocode(ADDRESS, scale)):
+        _, seconds, peak = measure(fetch_cold, layer, tags, area, fetch, repeat=repeat)
+        results[stage] = {'seconds': seconds, 'peak_bytes': peak, 'output_bytes': 0}
+
+    ctx, seconds, peak = measure(build_site_context, ADDRESS, scale, grid_size, repeat=repeat)
+    results['context'] = {'seconds': seconds, 'peak_bytes': peak, 'output_bytes': 0}
+
+    for name, render in MAPS.items():
+        html, seconds, peak = measure(render_fresh, render, ctx, repeat=repeat)
+        if html.startswith('Error'):
+            raise SystemExit(f"{name}: {html}")
+        results[name] = {'seconds': seconds, 'peak_bytes': peak, 'output_bytes': len(html)}
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Human-readable regressions of results against a baseline."""
+    regressions = []
+    for case, stages in results.items():
+        for stage, now in stages.items():
+            before = baseline.get(case, {}).get(stage)
+            if before is None:
+                continue
+            for metric, floor in [('seconds', MIN_SECONDS), ('peak_bytes', MIN_BYTES), ('output_bytes', MIN_BYTES)]:
+                if now[metric] > before[metric] * (1 + threshold) and now[metric] - before[metric] > floor:
+                    regressions.append(f"{case} {stage} {metric}: {before[metric]:.4g} -> {now[metric]:.4g}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 25, 50])
+    parser.add_argument('--grids', type=int, nargs='+', default=[50, 100])
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best counts")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_path = os.path.abspath(args.save) if args.save else None
+    fetch = overpass_stand_in(load_overpass_fixtures())
+
+    # Every case starts from empty caches and renders every map rather than serving cached HTML
+    root = tempfile.mkdtemp(prefix='pipeline_benchmark_')
+    os.environ[coords.OFFLINE_ENV] = '1'
+    os.environ[htmlcache.HTML_CACHE_ENV] = '0'
+    train_model(root, fetch)
+
+    results = {}
+    print(f"{'case':<18} {'stage':<22} {'seconds':>9} {'peak (MB)':>10} {'output (KB)':>12}")
+    for scale in args.scales:
+        for grid_size in args.grids:
+            case = f'scale={scale} grid={grid_size}'
+            enter_workdir(root, f'scale{scale}_grid{grid_size}')
+            results[case] = run_case(scale, grid_size, fetch, args.repeat)
+            for stage, r in results[case].items():
+                print(f"{case:<18} {stage:<22} {r['seconds']:>9.3f} {r['peak_bytes'] / 2 ** 20:>10.1f} "
+                      f"{r['output_bytes'] / 1024:>12.0f}")
+
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {save_path}")
+
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions past {args.threshold:.0%}:", *regressions, sep='\n  ')
+            sys.exit(1)
+        print(f"No regressions past {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
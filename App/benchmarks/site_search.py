@@ -0,0 +1,160 @@
+"""Check the coarse-to-fine site search against a brute-force fine grid.
+
+Run from the App directory:
+
+    python -m benchmarks.site_search
+
+Builds a site from synthetic land use and power lines in a temporary tile
+store, runs hierarchical_search and grid_search at the same final resolution
+for a few criteria. It exits non-zero if the hierarchical search's best score
+is more than --tolerance below the brute-force best. It also exits non-zero if
+the cells the map would mark score more than --selection-tolerance below the
+same number of brute-force best cells, on average.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+from Modules.context import build_site_context
+from Modules.final_map import (
+    SEARCH_COARSE_SIZE, SEARCH_REFINE_FACTOR, SEARCH_TARGET_CELL_KM, SEARCH_TOP_K,
+    assemble_features, feature_matrix, grid_search, hierarchical_search, train_site_classifier,
+)
+from Modules.power import KM_PER_DEGREE_LAT, KM_PER_DEGREE_LON, POWER_TAGS
+from Modules.scoring import SiteCriteria
+from Modules.tiles import load_features
+from benchmarks.landuse_join import make_land_use_gdf
+
+# About 200 x 200 km around Mumbai, the size of a scale=100 request
+BBOX = (18.15, 19.95, 71.92, 73.82)
+
+# Best suitability (0-1) the hierarchical search may miss by
+SEARCH_TOLERANCE = 0.02
+# Mean suitability the marked cells may miss the brute-force best cells by. Exact cell
+# recall is only reported: sites along a power line score within noise of each other
+SELECTION_TOLERANCE = 0.02
+
+CRITERIA = [
+    SiteCriteria(),
+    SiteCriteria('Solar', land_availability=50),
+    SiteCriteria('Wind', grid_proximity=80),
+    SiteCriteria('Hybrid', env_tolerance=80, grid_proximity=50, land_availability=50),
+]
+
+def make_power_gdf(num_lines: int, bbox: tuple, seed: int = 3):
+    """Random straight power lines crossing the bounding box."""
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = bbox
+    geometry = [
+        LineString(zip(rng.uniform(min_lon, max_lon, 2), rng.uniform(min_lat, max_lat, 2)))
+        for _ in range(num_lines)
+    ]
+    return gpd.GeoDataFrame({'power': ['line'] * num_lines}, geometry=geometry, crs='EPSG:4326')
+
+def fixture_fetch(gdf):
+    """A stand-in for Overpass serving a fixed GeoDataFrame, indexed like osmnx results."""
+    gdf = gdf.copy()
+    gdf.index = pd.MultiIndex.from_arrays([['way'] * len(gdf), np.arange(len(gdf))], names=['element_type', 'osmid'])
+    return lambda coords, tags: gdf.cx[coords[2]:coords[3], coords[0]:coords[1]]
+
+def search_levels(coarse_size: int, factor: int, target_km: float, bbox: tuple = BBOX) -> int:
+    min_lat, max_lat, min_lon, max_lon = bbox
+    km_per_lon = KM_PER_DEGREE_LON * np.cos(np.radians((min_lat + max_lat) / 2))
+    cell_km = max((max_lat - min_lat) * KM_PER_DEGREE_LAT, (max_lon - min_lon) * km_per_lon) / coarse_size
+    levels = 0
+    while cell_km > target_km:
+        cell_km /= factor
+        levels += 1
+    return levels
+
+def top_recall(fine_cells, fine_scores, cells, n: int) -> float:
+    """Share of the brute-force top n cells that the hierarchical search also scored."""
+    top = fine_cells[np.argsort(fine_scores)[::-1][:n]]
+    found = {(round(lat, 9), round(lon, 9)) for lat, lon in zip(cells['lat'], cells['lon'])}
+    return np.mean([(round(lat, 9), round(lon, 9)) in found for lat, lon in zip(top['lat'], top['lon'])])
+
+def selection_gap(fine_scores, scores) -> float:
+    """Mean score of the brute-force top n minus that of the cells the map marks from the search.
+
+    n is the number score_sites marks, the top 10% of the finest searched cells.
+    """
+    n = int(np.sum(scores >= np.percentile(scores, 90)))
+    return np.sort(fine_scores)[::-1][:n].mean() - np.sort(scores)[::-1][:n].mean()
+
+def make_site(bbox: tuple, polygons: int, lines: int, scale: int = 100):
+    """(ctx, model) for synthetic land use and power lines, in the working directory's tile store."""
+    load_features('landuse', {'landuse': True}, list(bbox), fetch=fixture_fetch(make_land_use_gdf(polygons, bbox=bbox)))
+    margin = 0.2  # Covers the distance cap around the edge tiles
+    power_bbox = [bbox[0] - margin, bbox[1] + margin, bbox[2] - margin, bbox[3] + margin]
+    load_features('power', POWER_TAGS, power_bbox, fetch=fixture_fetch(make_power_gdf(lines, power_bbox)))
+
+    ctx = build_site_context('benchmark', scale, coords=list(bbox))
+    cells, labels = assemble_features(ctx)
+    return ctx, ('benchmark', *train_site_classifier(feature_matrix(cells), labels))
+
+def search_gaps(ctx, model, criteria, coarse_size: int, factor: int, top_k: int, target_km: float) -> dict:
+    """Hierarchical search against grid_search at the same final resolution, with timings."""
+    levels = search_levels(coarse_size, factor, target_km, tuple(ctx.coords))
+    start = time.perf_counter()
+    cells, scores = hierarchical_search(ctx, model, criteria, coarse_size, factor, top_k, target_km)
+    hier_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fine_cells, fine_scores = grid_search(ctx, model, criteria, coarse_size * factor ** levels)
+    brute_time = time.perf_counter() - start
+
+    return {
+        'levels': levels,
+        'hier_seconds': hier_time,
+        'brute_seconds': brute_time,
+        'gap': fine_scores.max() - scores.max(),
+        'selection_gap': selection_gap(fine_scores, scores),
+        'top10': top_recall(fine_cells, fine_scores, cells, 10),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polygons', type=int, default=20_000)
+    parser.add_argument('--lines', type=int, default=60)
+    parser.add_argument('--coarse', type=int, default=SEARCH_COARSE_SIZE)
+    parser.add_argument('--factor', type=int, default=SEARCH_REFINE_FACTOR)
+    parser.add_argument('--top-k', type=int, default=SEARCH_TOP_K)
+    parser.add_argument('--target-km', type=float, default=SEARCH_TARGET_CELL_KM)
+    parser.add_argument('--tolerance', type=float, default=SEARCH_TOLERANCE)
+    parser.add_argument('--selection-tolerance', type=float, default=SELECTION_TOLERANCE)
+    args = parser.parse_args()
+
+    levels = search_levels(args.coarse, args.factor, args.target_km)
+    fine_size = args.coarse * args.factor ** levels
+
+    # Keep the fixture tiles away from the real tile store
+    os.chdir(tempfile.mkdtemp(prefix='site_search_'))
+    ctx, model = make_site(BBOX, args.polygons, args.lines)
+
+    print(f"coarse {args.coarse}^2, factor {args.factor}, top {args.top_k}, {levels} levels "
+          f"-> {fine_size}^2 fine grid")
+    print(f"{'criteria':<44} {'hier (s)':>9} {'cells':>7} {'brute (s)':>10} {'cells':>8} "
+          f"{'gap':>7} {'sel gap':>8} {'top10':>6}")
+
+    failed = False
+    for criteria in CRITERIA:
+        r = search_gaps(ctx, model, criteria, args.coarse, args.factor, args.top_k, args.target_km)
+        hier_cells = args.coarse ** 2 + levels * args.top_k * args.factor ** 2
+        failed |= r['gap'] > args.tolerance or r['selection_gap'] > args.selection_tolerance
+        label = (f"{criteria.site_type} env={criteria.env_tolerance} grid={criteria.grid_proximity} "
+                 f"land={criteria.land_availability}")
+        print(f"{label:<44} {r['hier_seconds']:>9.2f} {hier_cells:>7} {r['brute_seconds']:>10.2f} "
+              f"{fine_size ** 2:>8} {r['gap']:>7.4f} {r['selection_gap']:>8.4f} {r['top10']:>6.0%}")
+
+    print(f"Tolerances: best score {args.tolerance}, marked cells {args.selection_tolerance}")
+    if failed:
+        raise SystemExit("Hierarchical search missed the brute-force result by more than the tolerance")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare HTML size and build time of the radiation layer: raw heatmap points vs a binned PNG overlay.
+
+Run from the App directory:
+
+    python -m benchmarks.solar_render
+"""
+import argparse
+import time
+
+import folium
+import numpy as np
+
+from Modules.solar import add_radiation_layer
+
+BBOX = [18.6, 19.5, 72.4, 73.3]
+
+def make_samples(num_points: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    return (rng.uniform(min_lat, max_lat, num_points),
+            rng.uniform(min_lon, max_lon, num_points),
+            rng.uniform(800, 2200, num_points))
+
+def measure(mode: str, samples, shape: tuple):
+    start = time.perf_counter()
+    m = folium.Map(location=[19.05, 72.85], zoom_start=10)
+    add_radiation_layer(m, *samples, BBOX, mode=mode, shape=shape)
+    html = m.get_root().render()
+    return time.perf_counter() - start, len(html.encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--raster', type=int, default=256, help="Overlay side in pixels")
+    parser.add_argument('--heatmap-limit', type=int, default=100_000, help="Largest sample count to build as a heatmap")
+    args = parser.parse_args()
+
+    shape = (args.raster, args.raster)
+    print(f"{'samples':>9} {'heatmap (s)':>12} {'heatmap (KB)':>13} {'raster (s)':>11} {'raster (KB)':>12}")
+    for num_points in args.samples:
+        samples = make_samples(num_points)
+        raster_time, raster_bytes = measure('raster', samples, shape)
+        if num_points <= args.heatmap_limit:
+            heatmap_time, heatmap_bytes = measure('heatmap', samples, shape)
+            heatmap = f"{heatmap_time:>12.3f} {heatmap_bytes / 1024:>13.0f}"
+        else:
+            heatmap = f"{'-':>12} {'-':>13}"
+        print(f"{num_points:>9} {heatmap} {raster_time:>11.3f} {raster_bytes / 1024:>12.0f}")
+
+if __name__ == "__main__":
+    main()
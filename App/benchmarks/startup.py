@@ -0,0 +1,119 @@
+"""Measure the app's cold start: first paint, reruns, and what the first analysis pays for imports.
+
+Run from the App directory:
+
+    python -m benchmarks.startup
+
+Each repeat starts a fresh interpreter, like a new server process. It imports
+Streamlit, then the app script. It runs the script through Streamlit's
+AppTest twice, for the first paint and a rerun, after warming AppTest itself
+on a one-element script. Then it imports the pipeline
+the way the first analysis does and runs the warm-up hook. A second pass
+checks first paint with SUSTAINASITE_WARMUP=1 and times the background
+warm-up to completion. Exits non-zero if the first paint or a rerun takes
+longer than --budget milliseconds.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(APP_DIR, 'main.py')
+
+WARMUP_THREAD = 'sustainasite-warm-up'
+
+# Stages held to the budget
+INTERACTIVE_STAGES = ['first paint', 'rerun', 'first paint (warm-up on)']
+
+def _timed(timings: dict, stage: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+def _run_app(app) -> None:
+    app.run()
+    if app.exception:
+        raise SystemExit(f"main.py raised: {app.exception}")
+
+def _test_harness(timings: dict):
+    """AppTest, with its own first-run setup done on a one-element script.
+
+    A running server has paid that setup before the first session connects, and
+    the first element only checks for a REPL outside a server.
+    """
+    from streamlit.testing.v1 import AppTest
+    _timed(timings, 'test harness', _run_app, AppTest.from_string("import streamlit as st\nst.empty()"))
+    return AppTest
+
+def measure_cold() -> dict:
+    """Stage -> seconds in this interpreter, which must not have imported anything yet."""
+    timings = {}
+    _timed(timings, 'import streamlit', __import__, 'streamlit')
+    _timed(timings, 'import main', __import__, 'main')
+
+    AppTest = _test_harness(timings)
+    app = AppTest.from_file(MAIN_SCRIPT)
+    _timed(timings, 'first paint', _run_app, app)
+    _timed(timings, 'rerun', _run_app, app)
+
+    def import_pipeline():
+        # The modules analyze_site imports on the first submit
+        import Modules.context, Modules.final_map, Modules.pipeline, Modules.registry, Modules.scoring  # noqa: E401,F401
+
+    _timed(timings, 'import pipeline', import_pipeline)
+
+    from Modules.pipeline import warm_up
+    _timed(timings, 'warm up', warm_up)
+    return timings
+
+def measure_warm_up_on() -> dict:
+    """First paint with the warm-up hook enabled, and how long the background warm-up takes."""
+    import threading
+
+    timings = {}
+    AppTest = _test_harness(timings)
+    os.environ['SUSTAINASITE_WARMUP'] = '1'
+    start = time.perf_counter()
+    _timed(timings, 'first paint (warm-up on)', _run_app, AppTest.from_file(MAIN_SCRIPT))
+
+    for thread in threading.enumerate():
+        if thread.name == WARMUP_THREAD:
+            thread.join()
+    timings['background warm-up'] = time.perf_counter() - start
+    return timings
+
+def run_fresh(measure: str) -> dict:
+    """Run one of this module's measure functions in a new interpreter and return its timings."""
+    env = {key: value for key, value in os.environ.items() if key != 'SUSTAINASITE_WARMUP'}
+    code = f"import json; from benchmarks.startup import {measure}; print(json.dumps({measure}()))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per pass; the best counts")
+    parser.add_argument('--budget', type=float, default=500, help="Milliseconds allowed for first paint and reruns")
+    args = parser.parse_args()
+
+    best = {}
+    for measure in ['measure_cold', 'measure_warm_up_on']:
+        for _ in range(args.repeat):
+            for stage, seconds in run_fresh(measure).items():
+                best[stage] = min(best.get(stage, float('inf')), seconds)
+
+    print(f"{'stage':<26} {'ms':>9}")
+    for stage, seconds in best.items():
+        print(f"{stage:<26} {seconds * 1000:>9.1f}")
+
+    over = [stage for stage in INTERACTIVE_STAGES if best[stage] * 1000 > args.budget]
+    print(f"Budget for first paint and reruns: {args.budget:g} ms")
+    if over:
+        raise SystemExit(f"Over budget: {', '.join(over)}")
+
+if __name__ == "__main__":
+    main()
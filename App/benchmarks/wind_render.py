@@ -0,0 +1,79 @@
+"""Compare HTML size and build time of the wind map: one SVG marker per cell vs the canvas layer.
+
+Run from the App directory:
+
+    python -m benchmarks.wind_render
+"""
+import argparse
+import math
+import time
+from types import SimpleNamespace
+
+import folium
+import numpy as np
+
+from Modules.wind import SPEED_COLORS, SPEED_THRESHOLDS, build_wind_map
+
+BBOX = [18.6, 19.5, 72.4, 73.3]
+
+def make_ctx(num_points: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    return SimpleNamespace(
+        address='benchmark',
+        coords=BBOX,
+        center=((min_lat + max_lat) / 2, (min_lon + max_lon) / 2),
+        lats=np.linspace(min_lat, max_lat, num_points),
+        lons=np.linspace(min_lon, max_lon, num_points),
+        wind_speeds=rng.uniform(0, 20, (num_points, num_points)),
+        wind_directions=rng.uniform(0, 360, (num_points, num_points)),
+    )
+
+def build_marker_map(ctx):
+    """The previous implementation: one DivIcon marker with inline SVG per grid cell."""
+    m = folium.Map(location=list(ctx.center), zoom_start=10, control_scale=True)
+    for i, lat in enumerate(ctx.lats):
+        for j, lon in enumerate(ctx.lons):
+            speed = ctx.wind_speeds[i, j]
+            direction = ctx.wind_directions[i, j]
+            color = SPEED_COLORS[int(np.searchsorted(SPEED_THRESHOLDS, speed, side='right'))]
+            arrow_html = f'''
+                <svg width="50" height="50">
+                    <defs>
+                        <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="0" refY="3.5" orient="auto">
+                            <polygon points="0 0, 10 3.5, 0 7" fill="{color}" />
+                        </marker>
+                    </defs>
+                    <line x1="25" y1="25" x2="{25 + 20 * math.sin(math.radians(direction))}" 
+                          y2="{25 - 20 * math.cos(math.radians(direction))}" 
+                          stroke="{color}" stroke-width="{1 + speed/5}" 
+                          marker-end="url(#arrowhead)" />
+                </svg>
+            '''
+            folium.Marker([lat, lon], icon=folium.DivIcon(html=arrow_html)).add_to(m)
+    return m
+
+def measure(build, ctx):
+    start = time.perf_counter()
+    html = build(ctx).get_root().render()
+    return time.perf_counter() - start, len(html.encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200])
+    parser.add_argument('--marker-limit', type=int, default=100, help="Largest grid to build with markers")
+    args = parser.parse_args()
+
+    print(f"{'grid':>9} {'markers (s)':>12} {'markers (KB)':>13} {'canvas (s)':>11} {'canvas (KB)':>12}")
+    for size in args.sizes:
+        ctx = make_ctx(size)
+        canvas_time, canvas_bytes = measure(build_wind_map, ctx)
+        if size <= args.marker_limit:
+            marker_time, marker_bytes = measure(build_marker_map, ctx)
+            markers = f"{marker_time:>12.3f} {marker_bytes / 1024:>13.0f}"
+        else:
+            markers = f"{'-':>12} {'-':>13}"
+        print(f"{size:>4}x{size:<4} {markers} {canvas_time:>11.3f} {canvas_bytes / 1024:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,30 @@
+import io
+import os
+import threading
 import streamlit as st
-from Modules.map import get_map
-from Modules.landuse import get_land_use_map
-from Modules.solar import get_radiation_map
-from Modules.wind import get_wind_map
-from Modules.final_map import create_ml_renewable_energy_map
+from Modules import metrics
 import streamlit.components.v1 as components
 
+# The geo and ML stacks (geopandas, shapely, sklearn, folium) are imported by the
+# stage that needs them, so the form paints and reruns without loading them.
+
+# Set SUSTAINASITE_WARMUP=1 to load the pipeline in the background when the server starts
+WARMUP_ENV = 'SUSTAINASITE_WARMUP'
+# Imports hold the GIL, so the warm-up waits until the first page has gone out
+WARMUP_DELAY = 1.0  # seconds
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up() -> threading.Thread:
+    """Warm the pipeline once per server process without holding up the first page."""
+    timer = threading.Timer(WARMUP_DELAY, _warm_up)
+    timer.name, timer.daemon = 'sustainasite-warm-up', True
+    timer.start()
+    return timer
+
+def _warm_up():
+    from Modules.pipeline import warm_up
+    warm_up()
+
 def main():
 
     st.set_page_config(
@@ -18,41 +37,133 @@ def main():
 
     st.html("<img src='data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSJub25lIiBzdHJva2U9IiMyYTlkOGYiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIiBjbGFzcz0ibHVjaWRlIGx1Y2lkZS1sZWFmeS1ncmVlbiI+PHBhdGggZD0iTTIgMjJjMS4yNS0uOTg3IDIuMjctMS45NzUgMy45LTIuMmE1LjU2IDUuNTYgMCAwIDEgMy44IDEuNSA0IDQgMCAwIDAgNi4xODctMi4zNTMgMy41IDMuNSAwIDAgMCAzLjY5LTUuMTE2QTMuNSAzLjUgMCAwIDAgMjAuOTUgOCAzLjUgMy41IDAgMSAwIDE2IDMuMDVhMy41IDMuNSAwIDAgMC01LjgzMSAxLjM3MyAzLjUgMy41IDAgMCAwLTUuMTE2IDMuNjkgNCA0IDAgMCAwLTIuMzQ4IDYuMTU1QzMuNDk5IDE1LjQyIDQuNDA5IDE2LjcxMiA0LjIgMTguMSAzLjkyNiAxOS43NDMgMy4wMTQgMjAuNzMyIDIgMjIiLz48cGF0aCBkPSJNMiAyMiAxNyA3Ii8+PC9zdmc+' style='width: 200px'><h1>Sustaina<span style='color: #2a9d8f'>Site</span></h1>")
 
-    # Capture the form data
-    form_data = det_form()
-
-    # Proceed only if form_data is valid (i.e., form was submitted)
-    if form_data:
+    # Batch screening of many sites from an uploaded CSV
+    with st.sidebar:
+        st.markdown("## Batch Screening")
+        sites_file = st.file_uploader("Upload a CSV of addresses or bounding boxes", type="csv")
+        screen_clicked = st.button("Screen Sites", disabled=sites_file is None)
 
-        siteType, location, capacity, envTolerance, gridProxi, landAvail, scale = form_data
+        st.markdown("## Debug")
+        profiler = st.selectbox("Profile requests with", metrics.PROFILERS,
+                                index=metrics.PROFILERS.index(metrics.default_profiler()))
 
-        st.markdown("## Site Details")
-        st.markdown(f"Site Type: {siteType} | Location: {location} | Production Capacity: {capacity} | Environmental Tolerance: {envTolerance} | Grid Proximity: {gridProxi} | Land Availability: {landAvail}")
+    if screen_clicked:
+        batch_screening(sites_file)
+        return
 
-        # Save map image after form submission
-        get_map(location, scale)
-        get_land_use_map(location, scale)
-        get_radiation_map(location, scale)
-        get_wind_map(location, scale)
+    # Capture the form data
+    form_data = det_form()
 
-        col1, col2 = st.columns(2, gap="small")
-        with col1:
-            render_html(f'tmp/{location}_map.html', caption=f"Map of Site Location - {location}")
-        with col2:
-            render_html(f'tmp/{location}_land_use_map.html', caption=f"Land Use Map of Site Location - {location}")
-      
-        col3, col4 = st.columns(2, gap="small")
-        with col3:
-            render_html(f'tmp/{location}_radiation_map.html', caption=f"Radiation Map of Site Location - {location}")
-        with col4:
-            render_html(f'tmp/{location}_wind_map.html', caption=f"Wind Map of Site Location - {location}")
+    if os.environ.get(WARMUP_ENV) == '1':
+        start_warm_up()
 
-        st.markdown("---")
+    # Proceed only if form_data is valid (i.e., form was submitted)
+    if form_data:
+        with metrics.collect() as request_metrics:
+            with metrics.profile(profiler):
+                analyze_site(form_data)
 
-        st.markdown("## Identified Locations!")
+        from Modules.pipeline import critical_path
 
-        create_ml_renewable_energy_map(location, scale)
-        render_html(f"tmp/{location}_ml_renewable_energy_map.html", caption='Potential Locations for {location}')
+        debug_panel(request_metrics)
+        siteType, location, capacity, envTolerance, gridProxi, landAvail, scale = form_data
+        metrics.log_request(
+            request_metrics, location=location, scale=scale, site_type=siteType,
+            critical_path=round(critical_path(request_metrics.timings()), 4),
+        )
+
+def analyze_site(form_data):
+
+    siteType, location, capacity, envTolerance, gridProxi, landAvail, scale = form_data
+
+    st.markdown("## Site Details")
+    st.markdown(f"Site Type: {siteType} | Location: {location} | Production Capacity: {capacity} | Environmental Tolerance: {envTolerance} | Grid Proximity: {gridProxi} | Land Availability: {landAvail}")
+
+    with st.spinner("Loading the siting pipeline..."), metrics.span('import pipeline'):
+        from Modules.context import build_site_context
+        from Modules.final_map import get_layers, search_mode
+        from Modules.pipeline import render_maps
+        from Modules.registry import load_active_model
+        from Modules.scoring import SiteCriteria
+
+    criteria = SiteCriteria(siteType, capacity, envTolerance, gridProxi, landAvail)
+
+    # Geocode and fetch every data layer once per site; changing only the weights reuses them
+    site_key = (location, scale)
+    if st.session_state.get('site_key') == site_key:
+        ctx = st.session_state['site_ctx']
+    else:
+        with st.spinner("Fetching site data..."):
+            # Land use already loaded for the last site is reused where the bounding boxes overlap
+            ctx = build_site_context(location, scale, previous=st.session_state.get('site_ctx'))
+        if isinstance(ctx, str):
+            st.error(ctx)
+            return
+        st.session_state['site_key'], st.session_state['site_ctx'] = site_key, ctx
+
+    # Compute the grid's scoring layers here so they are kept on the session's context
+    model = load_active_model()
+    if model is not None and search_mode(scale) == 'grid':
+        with st.spinner("Scoring site..."), metrics.span('score layers'):
+            get_layers(ctx, model)
+
+    captions = {
+        'map': f"Map of Site Location - {location}",
+        'land_use': f"Land Use Map of Site Location - {location}",
+        'radiation': f"Radiation Map of Site Location - {location}",
+        'wind': f"Wind Map of Site Location - {location}",
+        'ml_renewable_energy': f"Potential Locations for {location}",
+    }
+
+    # Lay out every map slot up front and fill each one as soon as its map is ready
+    slots = {}
+    col1, col2 = st.columns(2, gap="small")
+    with col1:
+        slots['map'] = st.empty()
+    with col2:
+        slots['land_use'] = st.empty()
+  
+    col3, col4 = st.columns(2, gap="small")
+    with col3:
+        slots['radiation'] = st.empty()
+    with col4:
+        slots['wind'] = st.empty()
+
+    st.markdown("---")
+
+    st.markdown("## Identified Locations!")
+    slots['ml_renewable_energy'] = st.empty()
+
+    for slot in slots.values():
+        slot.info("Rendering map...")
+
+    for name, html, seconds in render_maps(ctx, criteria=criteria):
+        with slots[name].container():
+            if html.startswith("Error"):
+                st.error(html)
+            else:
+                render_html(html, caption=captions[name])
+
+def debug_panel(request_metrics):
+    from Modules.pipeline import critical_path
+
+    timings = request_metrics.timings()
+    calls = request_metrics.calls()
+
+    with st.expander("Debug metrics"):
+        st.caption(f"Critical path: {critical_path(timings):.2f} s")
+        st.table({
+            'stage': list(timings),
+            'seconds': [f"{seconds:.3f}" for seconds in timings.values()],
+            'calls': [calls[stage] for stage in timings],
+        })
+        if request_metrics.counters:
+            st.table({'counter': list(request_metrics.counters), 'count': list(request_metrics.counters.values())})
+        if request_metrics.sizes:
+            st.table({'map': list(request_metrics.sizes), 'HTML (KB)': [f"{nbytes / 1024:.0f}" for nbytes in request_metrics.sizes.values()]})
+        if request_metrics.profile:
+            st.caption("Profile of the app's own thread; fetches and renders run in workers")
+            st.code(request_metrics.profile)
 
 def det_form():
 
@@ -79,14 +190,42 @@ def det_form():
 
     return None
 
-def render_html(path: str, caption: str):
+def batch_screening(sites_file):
+    import pandas as pd
+    from Modules.batch import RESULT_COLUMNS, read_sites, run_batch
+    from Modules.pipeline import RENDER_WORKERS, get_render_pool
+
     try:
-        with open(path, 'r', encoding='utf-8') as f:  # Ensure UTF-8 encoding is used
-            html_data = f.read()
-        components.html(html_data, width=800, height=800)
-        st.caption(caption)
-    except UnicodeDecodeError as e:
-        st.error(f"Error reading the HTML file: {e}")
+        sites = read_sites(sites_file)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    st.markdown(f"## Batch Screening - {len(sites)} Sites")
+    progress = st.progress(0.0)
+    table = st.empty()
+
+    # Results stream into the table as each site completes
+    rows = []
+    # With render workers disabled, run_batch creates a pool of its own
+    for row in run_batch(sites, get_render_pool() if RENDER_WORKERS > 0 else None):
+        rows.append(row)
+        progress.progress(len(rows) / len(sites))
+        table.dataframe(pd.DataFrame(rows, columns=RESULT_COLUMNS), use_container_width=True)
+
+    results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    parquet = io.BytesIO()
+    results.to_parquet(parquet, index=False)
+
+    col1, col2 = st.columns(2, gap="small")
+    with col1:
+        st.download_button("Download CSV", results.to_csv(index=False), file_name="screening_results.csv", mime="text/csv")
+    with col2:
+        st.download_button("Download Parquet", parquet.getvalue(), file_name="screening_results.parquet")
+
+def render_html(html_data: str, caption: str):
+    components.html(html_data, width=800, height=800)
+    st.caption(caption)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pytest
+
+# Tests import the app's modules the way the app does, from the App directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modules.context import SiteContext  # noqa: E402
+
+@pytest.fixture
+def half_covered_site() -> SiteContext:
+    """A 20 x 20 site whose radiation raster only covers its southern half."""
+    size = 20
+    rng = np.random.default_rng(0)
+    radiation = rng.uniform(800, 2200, (size, size))
+    radiation[size // 2:] = np.nan
+    return SiteContext(
+        address='test',
+        scale=10,
+        coords=[19.0, 19.1, 72.8, 72.9],
+        land_use_gdf=gpd.GeoDataFrame({'landuse': []}, geometry=[], crs='EPSG:4326'),
+        lats=np.linspace(19.0, 19.1, size),
+        lons=np.linspace(72.8, 72.9, size),
+        radiation_levels=radiation,
+        wind_speeds=rng.uniform(0, 20, (size, size)),
+        wind_directions=rng.uniform(0, 360, (size, size)),
+        grid_distances=rng.uniform(0, 10, (size, size)),
+    )
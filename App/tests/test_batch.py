@@ -0,0 +1,73 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from Modules import batch, pipeline
+from Modules.final_map import assemble_features, feature_matrix, train_site_classifier
+
+class BreakingExecutor:
+    """Runs the first site, then breaks: pending work fails and later submits are refused."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, site):
+        self.submitted += 1
+        future = Future()
+        if self.submitted == 1:
+            future.set_result(fn(site))
+        elif self.submitted == 2:
+            future.set_exception(BrokenProcessPool("A worker died"))
+        else:
+            raise BrokenProcessPool("A worker died")
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+def test_sites_are_screened_in_process_when_the_pool_breaks(monkeypatch):
+    monkeypatch.setattr(batch, 'screen_site', lambda site: {'name': site['name']})
+    sites = [{'name': f'site {i}', 'address': '', 'scale': 10, 'coords': [0, 1, 0, 1]} for i in range(4)]
+
+    rows = list(batch.run_batch(sites, BreakingExecutor()))
+    assert sorted(row['name'] for row in rows) == [site['name'] for site in sites]
+
+def test_a_broken_shared_render_pool_is_reset(monkeypatch):
+    monkeypatch.setattr(batch, 'screen_site', lambda site: {'name': site['name']})
+    executor = BreakingExecutor()
+    monkeypatch.setattr(pipeline, '_render_pool', executor)
+    sites = [{'name': f'site {i}', 'address': '', 'scale': 10, 'coords': [0, 1, 0, 1]} for i in range(4)]
+
+    list(batch.run_batch(sites, executor))
+    # The next session gets a fresh pool instead of the broken one
+    assert pipeline._render_pool is None
+
+def test_means_skip_cells_without_resource_data(monkeypatch, half_covered_site):
+    cells, labels = assemble_features(half_covered_site)
+    model = ('test', *train_site_classifier(feature_matrix(cells), labels))
+    monkeypatch.setattr(batch, 'load_active_model', lambda: model)
+    monkeypatch.setattr(batch, 'build_site_context', lambda *args, **kwargs: half_covered_site)
+
+    row = batch.screen_site({'name': 'test', 'address': None, 'scale': 10, 'coords': half_covered_site.coords})
+    assert row['error'] is None
+    assert row['mean_radiation'] == np.nanmean(half_covered_site.radiation_levels)
+
+class InlineExecutor:
+    """Finishes each site as soon as it is submitted."""
+
+    def submit(self, fn, site):
+        future = Future()
+        future.set_result(fn(site))
+        return future
+
+def test_finished_sites_are_yielded_while_geocoding_continues(monkeypatch):
+    geocoded = []
+    monkeypatch.setattr(batch, 'screen_site', lambda site: {'name': site['name']})
+    monkeypatch.setattr(batch, 'geocode', lambda address, scale: geocoded.append(address) or [0, 1, 0, 1])
+    sites = [{'name': f'site {i}', 'address': f'address {i}', 'scale': 10, 'coords': None} for i in range(3)]
+
+    rows = batch.run_batch(sites, InlineExecutor())
+    assert next(rows) == {'name': 'site 0'}
+    assert geocoded == ['address 0']
+    assert [row['name'] for row in rows] == ['site 1', 'site 2']
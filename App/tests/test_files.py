@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from Modules.files import atomic_write
+
+def test_a_failed_write_keeps_the_old_file(tmp_path):
+    path = os.path.join(tmp_path, 'nested', 'ACTIVE')
+    with atomic_write(path, 'w') as f:
+        f.write('v1')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path, 'w') as f:
+            f.write('v2')
+            raise RuntimeError("Interrupted")
+
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'v1'
+    assert os.listdir(os.path.dirname(path)) == ['ACTIVE']
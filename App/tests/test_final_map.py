@@ -0,0 +1,14 @@
+import numpy as np
+
+from Modules.final_map import assemble_features, feature_matrix, score_sites, train_site_classifier
+
+def test_cells_without_resource_data_are_not_scored(half_covered_site):
+    ctx = half_covered_site
+    cells, labels = assemble_features(ctx)
+    assert len(cells) == 200 and np.isfinite(feature_matrix(cells)).all()
+    model = ('test', *train_site_classifier(feature_matrix(cells), labels))
+
+    cells, scores, selected = score_sites(ctx, model)
+    assert len(cells) == 200
+    assert np.isfinite(scores).all()
+    assert selected.sum() >= 20
@@ -0,0 +1,25 @@
+import contextlib
+import os
+
+from Modules import htmlcache
+
+def test_eviction_skips_maps_another_worker_removed(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(htmlcache.HTML_CACHE_DIR)
+    for name in ['a', 'b', 'c']:
+        with open(os.path.join(htmlcache.HTML_CACHE_DIR, f'{name}.html'), 'w') as f:
+            f.write('x' * 100)
+
+    scandir = os.scandir
+
+    @contextlib.contextmanager
+    def racing_scandir(path):
+        # Another worker removes a map after this one has listed the directory
+        with scandir(path) as it:
+            entries = list(it)
+        os.remove(os.path.join(path, 'b.html'))
+        yield iter(entries)
+
+    monkeypatch.setattr(htmlcache.os, 'scandir', racing_scandir)
+    htmlcache._evict(100)
+    assert len(os.listdir(htmlcache.HTML_CACHE_DIR)) == 1
@@ -0,0 +1,32 @@
+import threading
+
+from Modules import metrics
+
+def _profiled_report(profiler: str) -> str:
+    with metrics.collect() as collected:
+        with metrics.profile(profiler):
+            sum(range(1000))
+    return collected.profile
+
+def test_concurrent_cprofile_requests_run_unprofiled():
+    reports = []
+    with metrics.collect() as collected:
+        with metrics.profile('cprofile'):
+            # A second session submitting while the first is profiled
+            thread = threading.Thread(target=lambda: reports.append(_profiled_report('cprofile')))
+            thread.start()
+            thread.join()
+
+    assert reports == ["Not profiled: another request is being profiled with cProfile"]
+    assert 'function calls' in collected.profile
+    # The profiler is free again once the first request finishes
+    assert 'function calls' in _profiled_report('cprofile')
+
+def test_cprofile_held_by_another_tool_runs_unprofiled(monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(metrics.cProfile, 'Profile', BusyProfile)
+    assert _profiled_report('cprofile') == "Not profiled: Another profiling tool is already active"
+    assert not metrics._cprofile_lock.locked()
@@ -0,0 +1,54 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from Modules import pipeline
+
+class InlinePool:
+    """Runs each task on submit, or refuses every submit once broken."""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("A worker died")
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+@pytest.fixture
+def pools(monkeypatch):
+    """Make get_render_pool hand out the given pools in turn."""
+    monkeypatch.setattr(pipeline, 'RENDER_WORKERS', 2)
+    monkeypatch.setattr(pipeline, 'MAP_RENDERERS', {'map': lambda ctx: 'map html', 'wind': lambda ctx: 'wind html'})
+
+    def use(*queue):
+        queue = list(queue)
+        monkeypatch.setattr(pipeline, '_render_pool', queue.pop(0))
+
+        def get_render_pool():
+            if pipeline._render_pool is None:
+                pipeline._render_pool = queue.pop(0)
+            return pipeline._render_pool
+
+        monkeypatch.setattr(pipeline, 'get_render_pool', get_render_pool)
+    return use
+
+def test_an_already_broken_pool_is_replaced(pools):
+    fresh = InlinePool()
+    pools(InlinePool(broken=True), fresh)
+
+    assert sorted(name for name, _, _ in pipeline.render_maps(None)) == ['map', 'wind']
+    assert pipeline._render_pool is fresh
+
+def test_maps_render_in_process_when_the_replacement_is_broken_too(pools):
+    pools(InlinePool(broken=True), InlinePool(broken=True))
+
+    rendered = {name: html for name, html, _ in pipeline.render_maps(None)}
+    assert rendered == {'map': 'map html', 'wind': 'wind html'}
+    assert pipeline._render_pool is None
@@ -0,0 +1,18 @@
+import json
+import os
+
+from sklearn.preprocessing import StandardScaler
+
+from Modules import registry
+
+def test_publishes_in_the_same_second_get_distinct_versions(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(registry.time, 'strftime', lambda fmt, t: '20260101-000000')
+
+    versions = [registry.publish_model({'n': n}, StandardScaler()) for n in range(3)]
+    assert versions == ['20260101-000000', '20260101-000000-2', '20260101-000000-3']
+    for version in versions:
+        with open(os.path.join(registry.MODEL_ROOT, version, 'metadata.json'), encoding='utf-8') as f:
+            assert json.load(f)['version'] == version
+    assert registry.active_version() == versions[-1]
+    assert not [name for name in os.listdir(registry.MODEL_ROOT) if name.endswith('.tmp')]
@@ -0,0 +1,24 @@
+import pytest
+
+from benchmarks.site_search import CRITERIA, SEARCH_TOLERANCE, SELECTION_TOLERANCE, make_site, search_gaps
+
+# About 40 x 40 km, searched 40^2 then refined once, against a 160^2 brute-force grid.
+# Coarse cells are about 1 km, like the app's; land use is dense enough that a
+# 10^2 or 32^2 start misses the best cells by well over the tolerances
+BBOX = (19.0, 19.36, 72.7, 73.08)
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    cwd = tmp_path_factory.mktemp('site_search')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Tiles are written under the working directory
+        monkeypatch.chdir(cwd)
+        yield make_site(BBOX, polygons=3000, lines=12, scale=20)
+
+@pytest.mark.parametrize('criteria', CRITERIA)
+def test_hierarchical_search_matches_brute_force(site, criteria):
+    ctx, model = site
+    gaps = search_gaps(ctx, model, criteria, coarse_size=40, factor=4, top_k=16, target_km=0.5)
+    assert gaps['levels'] == 1
+    assert gaps['gap'] <= SEARCH_TOLERANCE
+    assert gaps['selection_gap'] <= SELECTION_TOLERANCE
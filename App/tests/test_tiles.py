@@ -0,0 +1,53 @@
+import pytest
+
+from Modules.context import fingerprint
+from Modules.tiles import extend_features, load_features, tile_groups
+from benchmarks.landuse_join import make_land_use_gdf
+from benchmarks.site_search import fixture_fetch
+
+TAGS = {'landuse': True}
+BBOX = [18.8, 19.3, 72.6, 73.1]
+FIXTURE_BBOX = (18.6, 19.5, 72.4, 73.3)
+
+@pytest.fixture
+def fetch(tmp_path, monkeypatch):
+    # Tiles are written under the working directory
+    monkeypatch.chdir(tmp_path)
+    return fixture_fetch(make_land_use_gdf(3000, bbox=FIXTURE_BBOX))
+
+def assert_same_features(actual, expected):
+    assert list(actual.index) == list(expected.index)
+    assert actual.geometry.geom_equals_exact(expected.geometry, tolerance=0).all()
+    assert actual['landuse'].tolist() == expected['landuse'].tolist()
+    assert fingerprint(actual) == fingerprint(expected)
+
+@pytest.mark.parametrize('coords', [
+    [18.9, 19.2, 72.7, 73.0],    # Contained
+    [18.7, 19.4, 72.5, 73.2],    # Growing
+    [18.95, 19.45, 72.75, 73.25],  # Shifted
+])
+def test_extend_features_matches_a_fresh_load(fetch, coords):
+    previous = load_features('landuse', TAGS, BBOX, fetch=fetch)
+    extended = extend_features('landuse', TAGS, coords, previous, BBOX, fetch=fetch)
+    assert_same_features(extended, load_features('landuse', TAGS, coords, fetch=fetch))
+
+def test_tile_groups_splits_a_ring_into_strips():
+    core = {(x, y) for x in range(3, 6) for y in range(3, 6)}
+    ring = [(x, y) for x in range(2, 7) for y in range(2, 7) if (x, y) not in core]
+    groups = tile_groups(ring)
+    assert len(groups) == 4
+    assert sorted(tile for group in groups for tile in group) == sorted(ring)
+
+def test_growing_box_fetches_only_the_missing_margin(fetch):
+    load_features('landuse', TAGS, BBOX, fetch=fetch)
+    fetched = []
+
+    def logging_fetch(coords, tags):
+        fetched.append(coords)
+        return fetch(coords, tags)
+
+    load_features('landuse', TAGS, [18.7, 19.4, 72.5, 73.2], fetch=logging_fetch)
+    assert fetched
+    # The cached tiles cover BBOX, so no fetch reaches into it
+    for min_lat, max_lat, min_lon, max_lon in fetched:
+        assert max_lat <= BBOX[0] or min_lat >= BBOX[1] or max_lon <= BBOX[2] or min_lon >= BBOX[3]
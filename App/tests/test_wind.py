@@ -0,0 +1,22 @@
+import base64
+
+import numpy as np
+
+from Modules.wind import NO_DATA, WindFieldLayer
+
+def decode(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+
+def test_cells_without_wind_data_are_marked_not_drawn():
+    speeds = np.full((4, 4), 8.0)
+    directions = np.full((4, 4), 90.0)
+    speeds[2:] = np.nan
+    directions[3, 0] = np.nan
+
+    options = WindFieldLayer(np.arange(4), np.arange(4), speeds, directions).options
+    assert options['maxSpeed'] == 8.0
+    encoded = decode(options['speeds']).reshape(4, 4)
+    # Valid cells keep their speed, the rest get the no-data byte
+    assert (encoded[:2] == NO_DATA - 1).all()
+    assert (encoded[2:] == NO_DATA).all()
+    assert decode(options['directions'])[0] == 64
@@ -0,0 +1,49 @@
+"""Train the site classifier offline and publish it as a new model version.
+
+Run from the repository root:
+
+    python App/train.py Mumbai "Phoenix, AZ" --scale 50
+
+The app picks up the new version on its next request without a restart.
+"""
+import argparse
+
+import numpy as np
+
+from Modules.context import build_site_context
+from Modules.final_map import assemble_features, feature_matrix, train_site_classifier
+from Modules.registry import publish_model
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish the renewable energy site classifier.")
+    parser.add_argument('addresses', nargs='+', help="Locations whose grids make up the training set")
+    parser.add_argument('--scale', type=int, default=50, help="Half-width of each bounding box in km")
+    parser.add_argument('--no-activate', action='store_true', help="Publish without making it the active version")
+    args = parser.parse_args()
+
+    features, labels = [], []
+    for address in args.addresses:
+        ctx = build_site_context(address, args.scale)
+        if isinstance(ctx, str):
+            print(f"Skipping {address}: {ctx}")
+            continue
+        cells, site_labels = assemble_features(ctx)
+        features.append(feature_matrix(cells))
+        labels.append(site_labels)
+
+    if not features:
+        raise SystemExit("No training data could be assembled")
+
+    features = np.concatenate(features)
+    labels = np.concatenate(labels)
+    clf, scaler = train_site_classifier(features, labels)
+
+    version = publish_model(
+        clf, scaler,
+        metadata={'addresses': args.addresses, 'scale': args.scale, 'samples': len(labels)},
+        activate=not args.no_activate,
+    )
+    print(f"Published model version {version}")
+
+if __name__ == "__main__":
+    main()